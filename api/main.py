@@ -27,7 +27,7 @@ from .database.redis_client import init_redis, close_redis, redis_manager
 from .middleware.rate_limiting import RateLimitMiddleware
 from .middleware.validation import ValidationMiddleware
 from core.mcp.agent_manager import get_mcp_agent_manager
-from core.base_agent import BaseAgent
+from core.base_agent import BaseAgent, close_openai_clients
 
 # Настройка логирования
 setup_structured_logging()
@@ -90,6 +90,9 @@ async def lifespan(app: FastAPI):
         await agent_manager.shutdown()
         logger.info("✅ Agent Manager завершил работу")
     
+    await close_openai_clients()
+    logger.info("✅ OpenAI клиенты закрыты")
+    
     await close_redis()
     logger.info("✅ Redis отключен")
     
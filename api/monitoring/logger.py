@@ -4,7 +4,10 @@
 """
 
 import logging
+import logging.handlers
+import atexit
 import json
+import queue
 import sys
 from datetime import datetime
 from typing import Dict, Any, Optional
@@ -55,6 +58,9 @@ from pathlib import Path
 correlation_id_var: ContextVar[Optional[str]] = ContextVar('correlation_id', default=None)
 user_id_var: ContextVar[Optional[str]] = ContextVar('user_id', default=None)
 
+# Фоновый поток записи логов (см. setup_structured_logging)
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+
 
 class CorrelationFilter(logging.Filter):
     """Фильтр для добавления correlation ID в лог записи"""
@@ -72,6 +78,19 @@ class CorrelationFilter(logging.Filter):
         return True
 
 
+class InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler для очереди внутри процесса
+
+    Стандартный prepare() форматирует запись и обнуляет exc_info (для pickle),
+    из-за чего JSON форматтер в потоке QueueListener теряет traceback.
+    Очередь не покидает процесс, поэтому запись передается как есть.
+    """
+    
+    def prepare(self, record):
+        return record
+
+
 class CustomJsonFormatter(jsonlogger.JsonFormatter):
     """Кастомный JSON форматтер для структурированных логов"""
     
@@ -136,28 +155,39 @@ def setup_structured_logging(log_level: str = "INFO", log_file: Optional[str] =
     # Console handler для разработки
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(json_formatter)
-    console_handler.addFilter(CorrelationFilter())
-    root_logger.addHandler(console_handler)
+    handlers = [console_handler]
     
     # File handler для production логов
     if log_file:
         file_handler = logging.FileHandler(log_file)
         file_handler.setFormatter(json_formatter)
-        file_handler.addFilter(CorrelationFilter())
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
     
     # Дополнительный file handler для всех логов
     all_logs_handler = logging.FileHandler(log_dir / "api.log")
     all_logs_handler.setFormatter(json_formatter)
-    all_logs_handler.addFilter(CorrelationFilter())
-    root_logger.addHandler(all_logs_handler)
+    handlers.append(all_logs_handler)
     
     # Отдельный handler для ошибок
     error_handler = logging.FileHandler(log_dir / "errors.log")
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(json_formatter)
-    error_handler.addFilter(CorrelationFilter())
-    root_logger.addHandler(error_handler)
+    handlers.append(error_handler)
+    
+    # Форматирование и запись выполняются в фоновом потоке QueueListener:
+    # в вызывающем коде (event loop) остается только постановка LogRecord в очередь.
+    # CorrelationFilter висит на QueueHandler, т.к. contextvars видны только в потоке источника
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = InProcessQueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationFilter())
+    root_logger.addHandler(queue_handler)
+    
+    _queue_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
     
     # Настройка логгеров сторонних библиотек
     logging.getLogger("uvicorn.access").handlers.clear()
@@ -245,6 +275,17 @@ class StructuredLogger:
         )
 
 
+def stop_structured_logging():
+    """Остановка фонового потока логирования с дозаписью очереди"""
+    global _queue_listener
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(stop_structured_logging)
+
+
 def get_logger(name: str) -> StructuredLogger:
     """
     Получение structured логгера
@@ -5,13 +5,15 @@
 """
 
 import asyncio
+import sys
 import time
 import json
 from datetime import datetime
 from typing import Dict, Any, List
 import traceback
+import numpy as np
 from dataclasses import dataclass
-from enum import Enum
+from enum import IntEnum
 
 # Импорты для тестирования
 from fastapi.testclient import TestClient
@@ -25,15 +27,15 @@ from core.data_providers.factory import DataProviderFactory
 from core.mcp.agent_manager import MCPAgentManager
 from core.interfaces.data_models import LeadInput, TaskType, AgentTask
 
-class TestStatus(Enum):
+class TestStatus(IntEnum):
     """Статусы тестов"""
-    PENDING = "pending"
-    RUNNING = "running"
-    PASSED = "passed"
-    FAILED = "failed"
-    SKIPPED = "skipped"
+    PENDING = 0
+    RUNNING = 1
+    PASSED = 2
+    FAILED = 3
+    SKIPPED = 4
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class TestResult:
     """Результат выполнения теста"""
     name: str
@@ -51,99 +53,69 @@ class ComprehensiveSystemTester:
         
     def log(self, message: str, level: str = "INFO"):
         """Логирование с timestamp"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {message}")
+        sys.stdout.write(f"[{time.strftime('%H:%M:%S')}] {level}: {message}\n")
+    
+    # Фазы тестирования: (заголовок, [(имя теста, имя метода), ...]).
+    # Вместо списка может быть указано имя метода, формирующего тесты динамически.
+    PHASES = [
+        ("📦 Тестирование базовых компонентов...", [
+            ("config_loading", "_test_config_loading"),
+            ("agent_imports", "_test_agent_imports"),
+            ("orchestrator_init", "_test_orchestrator_init"),
+        ]),
+        ("🗄️ Тестирование Data Providers...", [
+            ("static_provider", "_test_static_provider"),
+            ("provider_factory", "_test_provider_factory"),
+        ]),
+        ("🤖 Тестирование всех 14 агентов...", "_agent_tests"),
+        ("🔗 Тестирование MCP интеграции...", [
+            ("mcp_manager", "_test_mcp_manager"),
+            ("mcp_agent_creation", "_test_mcp_agent_creation"),
+        ]),
+        ("🌐 Тестирование FastAPI endpoints...", [
+            ("api_health", "_test_api_health"),
+            ("api_auth", "_test_api_auth"),
+            ("api_agents", "_test_api_agents"),
+            ("api_tasks", "_test_api_tasks"),
+        ]),
+        ("🎯 Тестирование оркестратора...", [
+            ("orchestrator_workflow", "_test_orchestrator_workflow"),
+        ]),
+        ("🔄 Тестирование интеграционных сценариев...", [
+            ("lead_processing_scenario", "_test_lead_processing_scenario"),
+            ("seo_audit_scenario", "_test_seo_audit_scenario"),
+        ]),
+    ]
     
     async def run_all_tests(self) -> Dict[str, Any]:
         """Запуск всех тестов системы"""
         self.log("🚀 Запуск комплексного тестирования AI SEO Architects", "INFO")
         
-        # 1. Тестирование базовых компонентов
-        await self.test_core_components()
-        
-        # 2. Тестирование Data Providers
-        await self.test_data_providers()
-        
-        # 3. Тестирование всех 14 агентов
-        await self.test_all_agents()
-        
-        # 4. Тестирование MCP интеграции
-        await self.test_mcp_integration()
-        
-        # 5. Тестирование API endpoints
-        await self.test_api_endpoints()
-        
-        # 6. Тестирование оркестратора
-        await self.test_orchestrator()
-        
-        # 7. Интеграционные тесты
-        await self.test_integration_scenarios()
+        for title, tests in self.PHASES:
+            self.log(title)
+            phase_tests = self._resolve_phase_tests(tests)
+            # Тесты выполняются последовательно: они разделяют состояние
+            # (провайдеры, MCP менеджер, оркестратор), а порядок логов важен для диагностики
+            for name, func in phase_tests:
+                self.results.append(await self.run_test(name, func))
         
         # Генерация отчета
         return self.generate_report()
     
-    async def test_core_components(self):
-        """Тестирование базовых компонентов"""
-        self.log("📦 Тестирование базовых компонентов...")
-        
-        # Тест конфигурации
-        await self.run_test("config_loading", self._test_config_loading)
-        
-        # Тест импортов агентов
-        await self.run_test("agent_imports", self._test_agent_imports)
-        
-        # Тест оркестратора
-        await self.run_test("orchestrator_init", self._test_orchestrator_init)
-    
-    async def test_data_providers(self):
-        """Тестирование провайдеров данных"""
-        self.log("🗄️ Тестирование Data Providers...")
-        
-        # Тест Static Provider
-        await self.run_test("static_provider", self._test_static_provider)
-        
-        # Тест Factory
-        await self.run_test("provider_factory", self._test_provider_factory)
-    
-    async def test_all_agents(self):
-        """Тестирование всех 14 агентов"""
-        self.log("🤖 Тестирование всех 14 агентов...")
-        
-        for agent_name, agent_class in AGENT_CLASSES.items():
-            await self.run_test(f"agent_{agent_name}", 
-                              lambda ac=agent_class, an=agent_name: self._test_single_agent(ac, an))
-    
-    async def test_mcp_integration(self):
-        """Тестирование MCP интеграции"""
-        self.log("🔗 Тестирование MCP интеграции...")
-        
-        await self.run_test("mcp_manager", self._test_mcp_manager)
-        await self.run_test("mcp_agent_creation", self._test_mcp_agent_creation)
+    def _resolve_phase_tests(self, tests) -> List[tuple]:
+        """Преобразование описания фазы в список (имя, корутинная функция)"""
+        if isinstance(tests, str):
+            return getattr(self, tests)()
+        return [(name, getattr(self, method_name)) for name, method_name in tests]
     
-    async def test_api_endpoints(self):
-        """Тестирование API endpoints"""
-        self.log("🌐 Тестирование FastAPI endpoints...")
-        
-        # Основные endpoints
-        await self.run_test("api_health", self._test_api_health)
-        await self.run_test("api_auth", self._test_api_auth)
-        await self.run_test("api_agents", self._test_api_agents)
-        await self.run_test("api_tasks", self._test_api_tasks)
+    def _agent_tests(self) -> List[tuple]:
+        """Динамический список тестов для всех зарегистрированных агентов"""
+        return [
+            (f"agent_{agent_name}", lambda ac=agent_class, an=agent_name: self._test_single_agent(ac, an))
+            for agent_name, agent_class in AGENT_CLASSES.items()
+        ]
     
-    async def test_orchestrator(self):
-        """Тестирование оркестратора"""
-        self.log("🎯 Тестирование оркестратора...")
-        
-        await self.run_test("orchestrator_workflow", self._test_orchestrator_workflow)
-    
-    async def test_integration_scenarios(self):
-        """Интеграционные сценарии"""
-        self.log("🔄 Тестирование интеграционных сценариев...")
-        
-        await self.run_test("lead_processing_scenario", self._test_lead_processing_scenario)
-        await self.run_test("seo_audit_scenario", self._test_seo_audit_scenario)
-    
-    async def run_test(self, test_name: str, test_func):
+    async def run_test(self, test_name: str, test_func) -> TestResult:
         """Запуск отдельного теста с обработкой ошибок"""
         start_time = time.time()
         
@@ -173,7 +145,7 @@ class ComprehensiveSystemTester:
             )
             self.log(f"❌ Тест {test_name} ПРОВАЛЕН: {str(e)}")
         
-        self.results.append(result)
+        return result
     
     # ===== ТЕСТЫ БАЗОВЫХ КОМПОНЕНТОВ =====
     
@@ -496,23 +468,34 @@ class ComprehensiveSystemTester:
         """Генерация финального отчета"""
         total_duration = time.time() - self.start_time
         
-        passed_tests = [r for r in self.results if r.status == TestStatus.PASSED]
-        failed_tests = [r for r in self.results if r.status == TestStatus.FAILED]
+        # Один проход по результатам вместо двух фильтраций
+        passed_count = 0
+        failed_tests = []
+        for r in self.results:
+            if r.status == TestStatus.PASSED:
+                passed_count += 1
+            elif r.status == TestStatus.FAILED:
+                failed_tests.append(r)
+        
+        success_rate = passed_count / len(self.results) * 100 if self.results else 0
         
-        success_rate = len(passed_tests) / len(self.results) * 100 if self.results else 0
+        # Агрегация длительностей одним проходом через NumPy
+        durations = np.fromiter((r.duration for r in self.results), dtype=np.float64, count=len(self.results))
+        avg_duration = float(durations.mean()) if durations.size else 0.0
         
         report = {
             "summary": {
                 "total_tests": len(self.results),
-                "passed": len(passed_tests),
+                "passed": passed_count,
                 "failed": len(failed_tests),
                 "success_rate": round(success_rate, 2),
+                "avg_test_duration": round(avg_duration, 3),
                 "total_duration": round(total_duration, 2)
             },
             "test_results": [
                 {
                     "name": r.name,
-                    "status": r.status.value,
+                    "status": r.status.name.lower(),
                     "duration": round(r.duration, 3),
                     "error": r.error,
                     "details": r.details
@@ -570,5 +553,7 @@ async def main():
         return 1
 
 if __name__ == "__main__":
+    from config.env import install_event_loop_policy
+    install_event_loop_policy()
     exit_code = asyncio.run(main())
     exit(exit_code)
\ No newline at end of file
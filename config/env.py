@@ -0,0 +1,49 @@
+"""
+Загрузка переменных окружения для AI SEO Architects
+Файл .env разбирается один раз в родительском процессе; воркеры
+uvicorn/gunicorn наследуют уже заполненный os.environ
+"""
+
+import asyncio
+import os
+import sys
+from dotenv import load_dotenv
+
+# Маркер в окружении: наследуется дочерними процессами и исключает
+# повторный разбор .env в каждом воркере
+ENV_BOOTSTRAP_MARKER = "AI_SEO_ENV_BOOTSTRAPPED"
+
+
+def bootstrap_env() -> None:
+    """Однократная загрузка .env в os.environ (существующие значения не перезаписываются)"""
+    
+    if os.environ.get(ENV_BOOTSTRAP_MARKER):
+        return
+    
+    load_dotenv(override=False)
+    os.environ[ENV_BOOTSTRAP_MARKER] = "1"
+
+
+def install_event_loop_policy() -> bool:
+    """
+    Установка быстрого event loop (uvloop, на Windows - winloop) для asyncio.run
+    
+    uvicorn подключает uvloop сам (loop="auto"), поэтому вызывать нужно только
+    в точках входа, запускающих агентов напрямую через asyncio.run.
+    
+    Returns:
+        bool: True если политика установлена, False если пакет недоступен
+    """
+    try:
+        if sys.platform == "win32":
+            import winloop as loop_module
+        else:
+            import uvloop as loop_module
+    except ImportError:
+        return False
+    
+    asyncio.set_event_loop_policy(loop_module.EventLoopPolicy())
+    return True
+
+
+__all__ = ["bootstrap_env", "install_event_loop_policy", "ENV_BOOTSTRAP_MARKER"]
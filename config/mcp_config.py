@@ -3,67 +3,279 @@ MCP Configuration для AI SEO Architects
 Централизованные настройки для Model Context Protocol интеграции
 """
 
+import copy
 import os
-from typing import Dict, Any
+import sys
+import json
+import asyncio
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any
+from config.env import bootstrap_env
 try:
-    from pydantic_settings import BaseSettings
-    from pydantic import Field
+    from pydantic_settings import BaseSettings, SettingsConfigDict
+    from pydantic import AliasChoices, Field, PrivateAttr, computed_field
 except ImportError:
     # Fallback для случаев когда pydantic-settings не установлен
-    from pydantic import BaseModel, Field
+    from pydantic import AliasChoices, BaseModel, Field, PrivateAttr, computed_field, ConfigDict as SettingsConfigDict
     BaseSettings = BaseModel
 
+
+def _derive_ws_url(http_url: str) -> str:
+    """WebSocket endpoint из HTTP URL (меняется только схема в начале строки)"""
+    if http_url.startswith("http"):
+        http_url = "ws" + http_url[len("http"):]
+    return http_url + "/ws"
+
+def _derive_health_url(http_url: str) -> str:
+    """Health check endpoint из MCP URL"""
+    return http_url.replace("/mcp/v1", "/health")
+
 class MCPSettings(BaseSettings):
     """MCP настройки с валидацией через Pydantic"""
     
-    model_config = {"extra": "ignore"}  # Игнорируем дополнительные поля
+    # .env загружается в os.environ через bootstrap_env(), поэтому
+    # pydantic-settings читает только окружение и не разбирает файл повторно
+    model_config = SettingsConfigDict(
+        env_file=None,
+        case_sensitive=False,
+        frozen=True,  # Неизменяемые настройки можно использовать как ключ кэша
+        populate_by_name=True,  # Допускаем как имена полей, так и имена переменных окружения
+        # (AliasChoices: имя поля первым, поэтому явный аргумент приоритетнее переменной окружения)
+        extra="ignore",  # Игнорируем дополнительные поля
+        defer_build=True  # Схема валидации строится при первом создании, а не при импорте
+    )
     
     # Основные настройки
-    mcp_enabled: bool = Field(default=True, env='MCP_ENABLED')
-    cache_ttl_minutes: int = Field(default=30, env='MCP_CACHE_TTL')
-    max_concurrent_requests: int = Field(default=10, env='MCP_MAX_CONCURRENT')
-    request_timeout_seconds: int = Field(default=30, env='MCP_TIMEOUT')
+    mcp_enabled: bool = Field(default=True, validation_alias=AliasChoices('mcp_enabled', 'MCP_ENABLED'))
+    cache_ttl_minutes: int = Field(default=30, validation_alias=AliasChoices('cache_ttl_minutes', 'MCP_CACHE_TTL'))
+    max_concurrent_requests: int = Field(default=10, validation_alias=AliasChoices('max_concurrent_requests', 'MCP_MAX_CONCURRENT'))
+    request_timeout_seconds: int = Field(default=30, validation_alias=AliasChoices('request_timeout_seconds', 'MCP_TIMEOUT'))
     
     # Anthropic MCP Server
-    anthropic_api_key: str = Field(default="", env='ANTHROPIC_API_KEY')
-    anthropic_mcp_enabled: bool = Field(default=True, env='ANTHROPIC_MCP_ENABLED')
+    anthropic_api_key: str = Field(default="", validation_alias=AliasChoices('anthropic_api_key', 'ANTHROPIC_API_KEY'))
+    anthropic_mcp_enabled: bool = Field(default=True, validation_alias=AliasChoices('anthropic_mcp_enabled', 'ANTHROPIC_MCP_ENABLED'))
     anthropic_mcp_url: str = Field(
         default="https://api.anthropic.com/mcp/v1",
-        env='ANTHROPIC_MCP_URL'
+        validation_alias=AliasChoices('anthropic_mcp_url', 'ANTHROPIC_MCP_URL')
     )
     
     # OpenAI MCP Server
-    openai_api_key: str = Field(default="", env='OPENAI_API_KEY')
-    openai_mcp_enabled: bool = Field(default=True, env='OPENAI_MCP_ENABLED')
+    openai_api_key: str = Field(default="", validation_alias=AliasChoices('openai_api_key', 'OPENAI_API_KEY'))
+    openai_mcp_enabled: bool = Field(default=True, validation_alias=AliasChoices('openai_mcp_enabled', 'OPENAI_MCP_ENABLED'))
     openai_mcp_url: str = Field(
         default="https://api.openai.com/mcp/v1",
-        env='OPENAI_MCP_URL'
+        validation_alias=AliasChoices('openai_mcp_url', 'OPENAI_MCP_URL')
     )
     
     # Google MCP Server (планируется)
-    google_api_key: str = Field(default="", env='GOOGLE_API_KEY')
-    google_mcp_enabled: bool = Field(default=False, env='GOOGLE_MCP_ENABLED')
+    google_api_key: str = Field(default="", validation_alias=AliasChoices('google_api_key', 'GOOGLE_API_KEY'))
+    google_mcp_enabled: bool = Field(default=False, validation_alias=AliasChoices('google_mcp_enabled', 'GOOGLE_MCP_ENABLED'))
     google_mcp_url: str = Field(
         default="https://api.google.com/mcp/v1",
-        env='GOOGLE_MCP_URL'
+        validation_alias=AliasChoices('google_mcp_url', 'GOOGLE_MCP_URL')
     )
     
     # Custom MCP Servers
-    custom_mcp_servers: Dict[str, Any] = Field(default_factory=dict)
+    custom_mcp_servers: dict[str, Any] = Field(default_factory=dict)
     
     # Fallback настройки
-    enable_fallback: bool = Field(default=True, env='MCP_ENABLE_FALLBACK')
-    fallback_provider: str = Field(default="mock", env='MCP_FALLBACK_PROVIDER')
+    enable_fallback: bool = Field(default=True, validation_alias=AliasChoices('enable_fallback', 'MCP_ENABLE_FALLBACK'))
+    fallback_provider: str = Field(default="mock", validation_alias=AliasChoices('fallback_provider', 'MCP_FALLBACK_PROVIDER'))
     
     # Monitoring
-    enable_metrics: bool = Field(default=True, env='MCP_ENABLE_METRICS')
-    metrics_export_interval: int = Field(default=60, env='MCP_METRICS_INTERVAL')
+    enable_metrics: bool = Field(default=True, validation_alias=AliasChoices('enable_metrics', 'MCP_ENABLE_METRICS'))
+    metrics_export_interval: int = Field(default=60, validation_alias=AliasChoices('metrics_export_interval', 'MCP_METRICS_INTERVAL'))
+    
+    # Производные URL вычисляются один раз при валидации настроек
+    _anthropic_ws_url: str = PrivateAttr(default="")
+    _anthropic_health_url: str = PrivateAttr(default="")
+    _openai_health_url: str = PrivateAttr(default="")
+    _google_health_url: str = PrivateAttr(default="")
+    
+    def model_post_init(self, __context: Any) -> None:
+        self._anthropic_ws_url = _derive_ws_url(self.anthropic_mcp_url)
+        self._anthropic_health_url = _derive_health_url(self.anthropic_mcp_url)
+        self._openai_health_url = _derive_health_url(self.openai_mcp_url)
+        self._google_health_url = _derive_health_url(self.google_mcp_url)
+    
+    @computed_field
+    @property
+    def anthropic_ws_url(self) -> str:
+        return self._anthropic_ws_url
+    
+    @computed_field
+    @property
+    def anthropic_health_url(self) -> str:
+        return self._anthropic_health_url
+    
+    @computed_field
+    @property
+    def openai_health_url(self) -> str:
+        return self._openai_health_url
+    
+    @computed_field
+    @property
+    def google_health_url(self) -> str:
+        return self._google_health_url
+    
+    def __hash__(self) -> int:
+        # custom_mcp_servers - словарь, поэтому хэшируем его JSON-представление
+        values = tuple(value for name, value in self if name != "custom_mcp_servers")
+        custom = json.dumps(self.custom_mcp_servers, sort_keys=True, default=str)
+        return hash((values, custom))
+    
+
+# Статические возможности встроенных MCP серверов. Неизменяемые
+# (MappingProxyType + кортежи); в конфигурацию попадают их копии (см. _thaw)
+_ANTHROPIC_CAPABILITIES = MappingProxyType({
+    "seo_analysis": MappingProxyType({
+        "supported_methods": ("get_resource", "search_resources"),
+        "supported_resources": ("seo_data", "content_data", "technical_audit"),
+        "quality_score": 9.5,
+        "cost_per_request": 0.01
+    }),
+    "content_analysis": MappingProxyType({
+        "supported_methods": ("get_resource", "create_resource"),
+        "supported_resources": ("content_data", "keyword_data"),
+        "quality_score": 9.8,
+        "cost_per_request": 0.015
+    })
+})
+
+_OPENAI_CAPABILITIES = MappingProxyType({
+    "content_generation": MappingProxyType({
+        "supported_methods": ("create_resource", "update_resource"),
+        "supported_resources": ("content_data", "keyword_data"),
+        "quality_score": 9.0,
+        "cost_per_request": 0.02
+    }),
+    "competitive_analysis": MappingProxyType({
+        "supported_methods": ("get_resource", "search_resources"),
+        "supported_resources": ("competitive_data", "serp_data"),
+        "quality_score": 8.5,
+        "cost_per_request": 0.025
+    })
+})
+
+_GOOGLE_CAPABILITIES = MappingProxyType({
+    "search_data": MappingProxyType({
+        "supported_methods": ("get_resource", "search_resources"),
+        "supported_resources": ("seo_data", "keyword_data", "analytics_data"),
+        "quality_score": 10.0,  # Google = лучшие SEO данные
+        "cost_per_request": 0.005
+    })
+})
+
+@dataclass(slots=True, frozen=True)
+class _ProviderTemplate:
+    """Шаблон встроенного MCP сервера. URL, ключ и флаг включения берутся
+    из полей MCPSettings с префиксом key (например, anthropic_mcp_url)"""
+    
+    key: str
+    name: str
+    priority: int
+    auth_type: str  # bearer_token | api_key
+    websocket: bool
+    capabilities: MappingProxyType
+    # Имена полей MCPSettings: вычисляются и интернируются один раз,
+    # а не собираются f-строкой при каждой сборке конфигурации
+    enabled_attr: str = field(init=False)
+    api_key_attr: str = field(init=False)
+    url_attr: str = field(init=False)
+    ws_url_attr: str = field(init=False)
+    health_url_attr: str = field(init=False)
     
+    def __post_init__(self):
+        for attr, suffix in (
+            ("enabled_attr", "_mcp_enabled"),
+            ("api_key_attr", "_api_key"),
+            ("url_attr", "_mcp_url"),
+            ("ws_url_attr", "_ws_url"),
+            ("health_url_attr", "_health_url"),
+        ):
+            object.__setattr__(self, attr, sys.intern(self.key + suffix))
 
-def create_mcp_config(settings: MCPSettings = None) -> Dict[str, Any]:
+_PROVIDER_TEMPLATES = (
+    _ProviderTemplate("anthropic", "anthropic_mcp", 10, "bearer_token", True, _ANTHROPIC_CAPABILITIES),  # Высокий приоритет
+    _ProviderTemplate("openai", "openai_mcp", 8, "bearer_token", False, _OPENAI_CAPABILITIES),  # Средний приоритет
+    _ProviderTemplate("google", "google_mcp", 9, "api_key", False, _GOOGLE_CAPABILITIES),  # Высокий приоритет для SEO данных
+)
+
+def _thaw(value: Any) -> Any:
+    """Изменяемая JSON-совместимая копия неизменяемой таблицы (dict/list вместо MappingProxyType/tuple)"""
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+def _build_server_entry(settings: MCPSettings, template: _ProviderTemplate) -> dict[str, Any]:
+    """Конфигурация одного встроенного MCP сервера по шаблону"""
+    
+    url = getattr(settings, template.url_attr)
+    api_key = getattr(settings, template.api_key_attr)
+    
+    endpoints = {"http": url}
+    if template.websocket:
+        endpoints["websocket"] = getattr(settings, template.ws_url_attr)
+    
+    if template.auth_type == "bearer_token":
+        authentication = {"type": "bearer_token", "token": api_key}
+    else:
+        authentication = {"type": "api_key", "api_key": api_key}
+    
+    return {
+        "name": template.name,
+        "version": "1.0",
+        "client_type": "http",
+        "priority": template.priority,
+        "endpoints": endpoints,
+        "authentication": authentication,
+        "health_check_url": getattr(settings, template.health_url_attr),
+        # Таблицы возможностей остаются внутренними: наружу отдаются обычные dict/list
+        "capabilities": _thaw(template.capabilities)
+    }
+
+def create_mcp_config(settings: MCPSettings = None) -> dict[str, Any]:
     """
     Создание конфигурации MCP из настроек
     
+    Сборка кэшируется по значению настроек; каждый вызов возвращает
+    независимую копию, которую можно изменять на месте.
+    
+    Args:
+        settings: MCPSettings объект (по умолчанию загружается из .env)
+        
+    Returns:
+        Словарь конфигурации для MCPDataProvider
+    """
+    
+    if settings is None:
+        bootstrap_env()
+        settings = MCPSettings()
+    
+    return copy.deepcopy(_build_mcp_config(settings))
+
+@lru_cache(maxsize=8)
+def _build_mcp_config(settings: MCPSettings) -> dict[str, Any]:
+    """Сборка конфигурации MCP, мемоизированная по настройкам"""
+    
+    entries = [
+        (template.key, _build_server_entry(settings, template))
+        for template in _enabled_templates(settings)
+    ]
+    return _assemble_config(settings, entries)
+
+async def create_mcp_config_async(settings: MCPSettings = None) -> dict[str, Any]:
+    """
+    Асинхронное создание конфигурации MCP
+    
+    Конфигурации серверов собираются конкурентно через asyncio.gather, чтобы
+    удаленные проверки (например, health check при сборке) выполнялись
+    параллельно: время сборки ~ max(timeout), а не сумма по серверам.
+    
     Args:
         settings: MCPSettings объект (по умолчанию загружается из .env)
         
@@ -72,8 +284,29 @@ def create_mcp_config(settings: MCPSettings = None) -> Dict[str, Any]:
     """
     
     if settings is None:
+        bootstrap_env()
         settings = MCPSettings()
     
+    templates = _enabled_templates(settings)
+    built = await asyncio.gather(
+        *(_build_server_entry_async(settings, template) for template in templates)
+    )
+    return _assemble_config(settings, [(t.key, entry) for t, entry in zip(templates, built)])
+
+async def _build_server_entry_async(settings: MCPSettings, template: _ProviderTemplate) -> dict[str, Any]:
+    """Асинхронная точка расширения для сборки конфигурации одного сервера"""
+    return _build_server_entry(settings, template)
+
+def _enabled_templates(settings: MCPSettings) -> list:
+    """Встроенные MCP серверы, включенные в настройках и имеющие API ключ"""
+    return [
+        template for template in _PROVIDER_TEMPLATES
+        if getattr(settings, template.enabled_attr) and getattr(settings, template.api_key_attr)
+    ]
+
+def _assemble_config(settings: MCPSettings, entries: list) -> dict[str, Any]:
+    """Итоговая конфигурация из общих настроек и собранных серверов"""
+    
     config = {
         "cache_ttl_minutes": settings.cache_ttl_minutes,
         "max_concurrent_requests": settings.max_concurrent_requests,
@@ -82,104 +315,22 @@ def create_mcp_config(settings: MCPSettings = None) -> Dict[str, Any]:
         "fallback_provider": settings.fallback_provider,
         "enable_metrics": settings.enable_metrics,
         "metrics_export_interval": settings.metrics_export_interval,
-        "mcp_servers": {}
+        "mcp_servers": dict(entries)
     }
     
-    # Anthropic MCP Server
-    if settings.anthropic_mcp_enabled and settings.anthropic_api_key:
-        config["mcp_servers"]["anthropic"] = {
-            "name": "anthropic_mcp",
-            "version": "1.0",
-            "client_type": "http",
-            "priority": 10,  # Высокий приоритет
-            "endpoints": {
-                "http": settings.anthropic_mcp_url,
-                "websocket": settings.anthropic_mcp_url.replace("http", "ws") + "/ws"
-            },
-            "authentication": {
-                "type": "bearer_token",
-                "token": settings.anthropic_api_key
-            },
-            "health_check_url": settings.anthropic_mcp_url.replace("/mcp/v1", "/health"),
-            "capabilities": {
-                "seo_analysis": {
-                    "supported_methods": ["get_resource", "search_resources"],
-                    "supported_resources": ["seo_data", "content_data", "technical_audit"],
-                    "quality_score": 9.5,
-                    "cost_per_request": 0.01
-                },
-                "content_analysis": {
-                    "supported_methods": ["get_resource", "create_resource"],
-                    "supported_resources": ["content_data", "keyword_data"],
-                    "quality_score": 9.8,
-                    "cost_per_request": 0.015
-                }
-            }
-        }
-    
-    # OpenAI MCP Server
-    if settings.openai_mcp_enabled and settings.openai_api_key:
-        config["mcp_servers"]["openai"] = {
-            "name": "openai_mcp",
-            "version": "1.0",
-            "client_type": "http",
-            "priority": 8,  # Средний приоритет
-            "endpoints": {
-                "http": settings.openai_mcp_url
-            },
-            "authentication": {
-                "type": "bearer_token",
-                "token": settings.openai_api_key
-            },
-            "health_check_url": settings.openai_mcp_url.replace("/mcp/v1", "/health"),
-            "capabilities": {
-                "content_generation": {
-                    "supported_methods": ["create_resource", "update_resource"],
-                    "supported_resources": ["content_data", "keyword_data"],
-                    "quality_score": 9.0,
-                    "cost_per_request": 0.02
-                },
-                "competitive_analysis": {
-                    "supported_methods": ["get_resource", "search_resources"],
-                    "supported_resources": ["competitive_data", "serp_data"],
-                    "quality_score": 8.5,
-                    "cost_per_request": 0.025
-                }
-            }
-        }
-    
-    # Google MCP Server (если включен)
-    if settings.google_mcp_enabled and settings.google_api_key:
-        config["mcp_servers"]["google"] = {
-            "name": "google_mcp",
-            "version": "1.0",
-            "client_type": "http",
-            "priority": 9,  # Высокий приоритет для SEO данных
-            "endpoints": {
-                "http": settings.google_mcp_url
-            },
-            "authentication": {
-                "type": "api_key",
-                "api_key": settings.google_api_key
-            },
-            "capabilities": {
-                "search_data": {
-                    "supported_methods": ["get_resource", "search_resources"],
-                    "supported_resources": ["seo_data", "keyword_data", "analytics_data"],
-                    "quality_score": 10.0,  # Google = лучшие SEO данные
-                    "cost_per_request": 0.005
-                }
-            }
-        }
-    
     # Добавляем custom серверы
     for server_name, server_config in settings.custom_mcp_servers.items():
         config["mcp_servers"][server_name] = server_config
     
     return config
 
-def get_development_config() -> Dict[str, Any]:
-    """Конфигурация для разработки"""
+def get_development_config() -> dict[str, Any]:
+    """Конфигурация для разработки (независимая копия кэшированного словаря)"""
+    return copy.deepcopy(_development_config())
+
+@lru_cache(maxsize=1)
+def _development_config() -> dict[str, Any]:
+    """Кэшированная конфигурация для разработки; наружу не отдается"""
     
     return {
         "cache_ttl_minutes": 5,  # Короткий кэш для разработки
@@ -212,9 +363,15 @@ def get_development_config() -> Dict[str, Any]:
         }
     }
 
-def get_production_config() -> Dict[str, Any]:
-    """Конфигурация для production"""
+def get_production_config() -> dict[str, Any]:
+    """Конфигурация для production (независимая копия кэшированного словаря)"""
+    return copy.deepcopy(_production_config())
+
+@lru_cache(maxsize=1)
+def _production_config() -> dict[str, Any]:
+    """Кэшированная конфигурация для production; наружу не отдается"""
     
+    bootstrap_env()
     settings = MCPSettings()
     config = create_mcp_config(settings)
     
@@ -235,28 +392,57 @@ def get_production_config() -> Dict[str, Any]:
     
     return config
 
-def get_mcp_health_check_config() -> Dict[str, Any]:
-    """Конфигурация для health checks"""
+def get_mcp_health_check_config() -> dict[str, Any]:
+    """
+    Конфигурация для health checks (независимая копия кэшированного словаря)
+    
+    Переменные окружения читаются один раз; после их изменения
+    вызовите refresh_health_check_config()
+    """
+    return copy.deepcopy(_health_check_config())
+
+@lru_cache(maxsize=1)
+def _health_check_config() -> dict[str, Any]:
+    """Кэшированная конфигурация для health checks; наружу не отдается"""
     
+    environ = os.environ
     return {
         "health_check_interval": 30,  # секунд
         "health_check_timeout": 10,   # секунд
         "unhealthy_threshold": 3,     # неуспешных проверок подряд
         "recovery_threshold": 2,      # успешных проверок для восстановления
         "alerts": {
-            "webhook_url": os.getenv("MCP_ALERTS_WEBHOOK"),
-            "email": os.getenv("MCP_ALERTS_EMAIL"),
-            "slack_channel": os.getenv("MCP_ALERTS_SLACK")
+            "webhook_url": environ.get("MCP_ALERTS_WEBHOOK"),
+            "email": environ.get("MCP_ALERTS_EMAIL"),
+            "slack_channel": environ.get("MCP_ALERTS_SLACK")
         }
     }
 
-# Готовые конфигурации
-DEVELOPMENT_MCP_CONFIG = get_development_config()
-PRODUCTION_MCP_CONFIG = get_production_config()
-HEALTH_CHECK_CONFIG = get_mcp_health_check_config()
+def refresh_health_check_config() -> dict[str, Any]:
+    """Сброс кэша health check конфигурации и повторное чтение окружения"""
+    
+    _health_check_config.cache_clear()
+    return get_mcp_health_check_config()
+
+# Готовые конфигурации вычисляются лениво при первом обращении (PEP 562),
+# чтобы импорт модуля не создавал MCPSettings и не читал .env
+_LAZY_CONFIGS = {
+    "DEVELOPMENT_MCP_CONFIG": get_development_config,
+    "PRODUCTION_MCP_CONFIG": get_production_config,
+    "HEALTH_CHECK_CONFIG": get_mcp_health_check_config,
+}
+
+def __getattr__(name: str) -> Any:
+    factory = _LAZY_CONFIGS.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return factory()
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_CONFIGS))
 
 # Функция для выбора конфигурации по окружению
-def get_config_for_environment(env: str = None) -> Dict[str, Any]:
+def get_config_for_environment(env: str = None) -> dict[str, Any]:
     """
     Получение конфигурации для окружения
     
@@ -271,20 +457,22 @@ def get_config_for_environment(env: str = None) -> Dict[str, Any]:
         env = os.getenv("ENVIRONMENT", "development").lower()
     
     if env == "production":
-        return PRODUCTION_MCP_CONFIG
+        return get_production_config()
     elif env == "development":
-        return DEVELOPMENT_MCP_CONFIG
+        return get_development_config()
     else:
         # По умолчанию development
-        return DEVELOPMENT_MCP_CONFIG
+        return get_development_config()
 
 # Экспортируемые константы
 __all__ = [
     "MCPSettings",
     "create_mcp_config",
+    "create_mcp_config_async",
     "get_development_config", 
     "get_production_config",
     "get_mcp_health_check_config",
+    "refresh_health_check_config",
     "get_config_for_environment",
     "DEVELOPMENT_MCP_CONFIG",
     "PRODUCTION_MCP_CONFIG", 
@@ -3,23 +3,344 @@
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, TYPE_CHECKING
+from dataclasses import dataclass, field
+from typing import Dict, Any, Optional, AsyncIterator, Callable, Union, TYPE_CHECKING
 from datetime import datetime
 import asyncio
+import hashlib
+import importlib.util
 import time
 import logging
-from functools import wraps
+import random
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import aclosing
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from types import MappingProxyType
+import httpx
+import numpy as np
 import openai
 import os
 
+from core.interfaces.data_models import SEOData, ClientData, CompetitiveData
+from core.llm_cache import LLMCache
+from core.util import json_dumps
+from config.env import bootstrap_env
+
 # Избегаем circular imports
 if TYPE_CHECKING:
     from core.mcp.data_provider import MCPDataProvider
 
 logger = logging.getLogger(__name__)
 
+# ID текущей задачи: виден во всех log записях агента внутри этой задачи (и её корутин)
+current_task_id: ContextVar[Optional[str]] = ContextVar("agent_task_id", default=None)
+
+
+class AgentLoggerAdapter(logging.LoggerAdapter):
+    """
+    Логгер агента с предзаполненными полями agent_id и task_id
+    
+    Поля передаются в LogRecord через extra, поэтому JSON форматтер
+    (api.monitoring.logger.CustomJsonFormatter) выводит их отдельными ключами.
+    """
+    
+    def process(self, msg, kwargs):
+        extra = kwargs.get("extra")
+        kwargs["extra"] = {**self.extra, "task_id": current_task_id.get(), **(extra or {})}
+        return msg, kwargs
+
+
+# Модели провайдеров, которые можно восстановить из внешнего кэша
+_CACHEABLE_MODELS = {model.__name__: model for model in (SEOData, ClientData, CompetitiveData)}
+
+# Настройки MCP по умолчанию, общие для всех агентов
+_MCP_PREFERENCES = MappingProxyType({
+    "cache_enabled": True,
+    "real_time_updates": False,
+    "data_freshness_threshold": "1h"
+})
+
+# Возможности агента по уровню (executive/management/operational)
+_LEVEL_CAPABILITIES = MappingProxyType({
+    "executive": ("strategic_planning", "enterprise_analysis", "roi_optimization"),
+    "management": ("task_coordination", "performance_monitoring", "team_management"),
+    "operational": ("data_processing", "automated_analysis", "report_generation"),
+})
+
+# Специфические возможности по ключевому слову в названии класса агента
+_CAPABILITY_KEYWORDS = MappingProxyType({
+    "seo": ("seo_analysis", "technical_audit", "keyword_research"),
+    "content": ("content_analysis", "content_strategy", "eeat_optimization"),
+    "competitive": ("competitive_analysis", "serp_analysis", "market_intelligence"),
+    "sales": ("lead_qualification", "sales_analysis", "proposal_generation"),
+    "link": ("link_analysis", "backlink_research", "outreach_automation"),
+    "reporting": ("business_intelligence", "data_visualization", "anomaly_detection"),
+})
+
+# LRU кэш контекста знаний агента: размер и время жизни записи (секунды).
+# Запрос включает JSON данных задачи, поэтому ключом служит его blake2b хеш
+_KNOWLEDGE_CACHE_SIZE = 256
+_KNOWLEDGE_CACHE_TTL = 300.0
+
+# Максимальная длина запроса к базе знаний (символов)
+_RAG_QUERY_MAX_CHARS = 512
+# Из них не больше половины отводится промпту: данные задачи всегда попадают в запрос
+_RAG_QUERY_PROMPT_CHARS = 256
+
+# Запросы, для которых поиск по базе знаний не выполняется: служебные команды
+# и запросы (промпт + данные задачи) короче _RAG_MIN_PROMPT_CHARS символов
+_RAG_SKIP_PROMPTS = frozenset({"ping", "healthcheck", "status"})
+_RAG_MIN_PROMPT_CHARS = 16
+
+# Фрагменты промпта format_prompt_with_rag (собираются через str.join).
+# Неизменная для агента часть идет первой: провайдеры кэшируют общий префикс
+# промпта побайтно, поэтому данные задачи и контекст знаний стоят в конце
+_PROMPT_HEADER = """
+Ты - {name}, специализированный AI-агент уровня {level}.
+
+ИНСТРУКЦИИ:
+1. Используй контекст знаний для формирования экспертного ответа
+2. Если контекст знаний релевантен - ссылайся на него
+3. Предоставь детальный и профессиональный ответ
+4. Форматируй ответ в JSON структуре как ожидается
+"""
+
+_PROMPT_TASK = """
+ЗАДАЧА:
+{prompt}
+
+ВХОДНЫЕ ДАННЫЕ:
+{task}
+"""
+
+_PROMPT_KNOWLEDGE = """
+
+КОНТЕКСТ ЗНАНИЙ (используй эту информацию для более точного ответа):
+{context}
+"""
+
+_PROMPT_FOOTER = """
+
+ОТВЕТ:"""
+
+# Максимум одновременных запросов к провайдерам данных от всех агентов процесса
+_PROVIDER_INFLIGHT = int(os.getenv("AGENT_PROVIDER_INFLIGHT", "64"))
+
+# Максимум одновременных запросов к OpenAI от всех агентов процесса: сверх лимита
+# запросы ждут в очереди, а не получают 429 и не уходят в retry с backoff
+_OPENAI_INFLIGHT = int(os.getenv("OPENAI_MAX_CONCURRENCY", "32"))
+
+# Общие неизменяемые параметры по умолчанию вместо нового {} на каждый вызов провайдера
+_EMPTY_PARAMS = MappingProxyType({})
+
+# Неизменяемые части fallback ответов, когда провайдер не может вернуть данные
+_NO_PROVIDER_FALLBACK = MappingProxyType({"source": "fallback", "status": "no_provider"})
+_MCP_UNAVAILABLE_FALLBACK = MappingProxyType({"source": "fallback", "status": "mcp_not_available"})
+
+def _provider_method(data_provider, method_name: str):
+    """Связанный метод провайдера или None, если провайдер его не реализует"""
+    method = getattr(data_provider, method_name, None)
+    return method if callable(method) else None
+
+
+# Общий для всех агентов OpenAI клиент: один пул соединений и TLS сессия
+# к api.openai.com вместо отдельного httpx пула на каждого агента.
+# httpx.AsyncClient привязан к event loop, в котором открыты его соединения,
+# поэтому клиент создается отдельно для каждого loop (как _openai_gate)
+try:
+    import h2  # noqa: F401  (HTTP/2 для httpx доступен только с пакетом h2)
+    _OPENAI_HTTP2 = True
+except ImportError:
+    _OPENAI_HTTP2 = False
+
+_OPENAI_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, openai.AsyncOpenAI]" = weakref.WeakKeyDictionary()
+# Клиент для обращений вне event loop (например, проверка доступности при создании агента)
+_OPENAI_CLIENT_NO_LOOP: Optional[openai.AsyncOpenAI] = None
+_OPENAI_CLIENT_LOCK = threading.Lock()
+
+# Метка агента, использующего общий клиент текущего event loop (см. BaseAgent.openai_client)
+_SHARED_OPENAI_CLIENT = object()
+
+
+@lru_cache(maxsize=1)
+def _openai_api_key() -> Optional[str]:
+    """
+    OPENAI_API_KEY читается один раз на процесс, при создании первого агента
+    (а не при импорте модуля); .env загружается лениво, поэтому сначала bootstrap_env
+    """
+    bootstrap_env()
+    return os.getenv("OPENAI_API_KEY")
+
+
+def _get_openai_client(api_key: str) -> openai.AsyncOpenAI:
+    """
+    Общий AsyncOpenAI клиент текущего event loop (создается лениво, один раз на loop).
+    Ключ API фиксирован на процесс (см. _openai_api_key)
+    """
+    global _OPENAI_CLIENT_NO_LOOP
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    client = _OPENAI_CLIENTS.get(loop) if loop is not None else _OPENAI_CLIENT_NO_LOOP
+    if client is not None:
+        return client
+    with _OPENAI_CLIENT_LOCK:
+        client = _OPENAI_CLIENTS.get(loop) if loop is not None else _OPENAI_CLIENT_NO_LOOP
+        if client is None:
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                http2=_OPENAI_HTTP2
+            )
+            client = openai.AsyncOpenAI(api_key=api_key, http_client=http_client)
+            if loop is not None:
+                _OPENAI_CLIENTS[loop] = client
+            else:
+                _OPENAI_CLIENT_NO_LOOP = client
+        return client
+
+
+
+async def close_openai_clients() -> None:
+    """
+    Закрытие общего OpenAI клиента текущего event loop и клиента, созданного вне loop.
+    Вызывается при завершении работы (lifespan API, конец скрипта): иначе пул соединений
+    httpx остается открытым до сборки мусора и выдает ResourceWarning.
+    Клиенты других event loop закрываются вызовом из этих loop
+    """
+    global _OPENAI_CLIENT_NO_LOOP
+    loop = asyncio.get_running_loop()
+    with _OPENAI_CLIENT_LOCK:
+        clients = (_OPENAI_CLIENTS.pop(loop, None), _OPENAI_CLIENT_NO_LOOP)
+        _OPENAI_CLIENT_NO_LOOP = None
+    for client in clients:
+        if client is not None:
+            await client.close()
+
+# ChromaDB Knowledge Manager загружается напрямую из файла, минуя knowledge/__init__
+# (там legacy FAISS код); модуль исполняется один раз на процесс
+_CHROMA_KM_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', 'knowledge', 'chroma_knowledge_manager.py')
+)
+
+
+@lru_cache(maxsize=None)
+def _get_knowledge_manager():
+    """Общий knowledge_manager из ChromaDB модуля (ленивая однократная загрузка)"""
+    # Если модуль уже импортирован обычным путем, используем его экземпляр,
+    # чтобы не держать в процессе два ChromaDB клиента
+    for module_name in ("knowledge.chroma_knowledge_manager", "chroma_knowledge_manager"):
+        chroma_module = sys.modules.get(module_name)
+        if chroma_module is not None:
+            return chroma_module.knowledge_manager
+    
+    spec = importlib.util.spec_from_file_location("chroma_knowledge_manager", _CHROMA_KM_PATH)
+    chroma_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(chroma_module)
+    sys.modules["chroma_knowledge_manager"] = chroma_module
+    return chroma_module.knowledge_manager
+
+
+class _EmbeddingBatcher:
+    """
+    Объединяет запросы эмбеддингов от разных агентов, пришедшие в течение
+    window секунд, в один вызов API (одинаковые запросы считаются один раз)
+    """
+    
+    def __init__(self, window: float = 0.01, max_batch: int = 64):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list = []  # (embed_many, query, future)
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: set = set()  # Сильные ссылки на запущенные пачки до их завершения
+    
+    def schedule(self, embed_many, query: str) -> "asyncio.Future":
+        """
+        Ставит запрос в текущую пачку
+        
+        Args:
+            embed_many: Синхронная функция list[str] -> list[list[float]]
+            query: Текст запроса
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Новый event loop: незавершенная пачка старого loop не переносится
+            self._pending = []
+            self._flush_handle = None
+            self._loop = loop
+        
+        future = loop.create_future()
+        self._pending.append((embed_many, query, future))
+        if len(self._pending) >= self.max_batch:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return future
+    
+    def _flush(self):
+        self._flush_handle = None
+        batch, self._pending = self._pending, []
+        groups: Dict[Any, list] = {}
+        for embed_many, query, future in batch:
+            groups.setdefault(embed_many, []).append((query, future))
+        for embed_many, items in groups.items():
+            task = asyncio.ensure_future(self._run(embed_many, items))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    @staticmethod
+    async def _run(embed_many, items: list):
+        texts = list(dict.fromkeys(query for query, _ in items))
+        try:
+            # Синхронный клиент эмбеддингов не должен блокировать event loop
+            vectors = await asyncio.to_thread(embed_many, texts)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        by_text = dict(zip(texts, vectors))
+        for query, future in items:
+            if not future.done():
+                future.set_result(by_text[query])
+
+
+_EMBED_BATCHER = _EmbeddingBatcher()
+
+
+def _get_agents_config():
+    """Глобальная конфигурация агентов (импорт откладывается до первого использования)"""
+    from core.config import get_config
+    return get_config()
+
+
+def _task_data_json(task_data: Any) -> str:
+    """Данные задачи в JSON для промпта (вместо Python repr словаря)"""
+    return json_dumps(task_data)
+
+
+def _rag_query(user_prompt: str, task_data: Any) -> str:
+    """
+    Запрос к базе знаний: начало промпта + данные задачи в детерминированном JSON
+    (sort_keys), не длиннее _RAG_QUERY_MAX_CHARS символов перед эмбеддингом.
+    Промпт ограничен _RAG_QUERY_PROMPT_CHARS, остаток бюджета отдается данным задачи
+    """
+    prompt = user_prompt[:_RAG_QUERY_PROMPT_CHARS]
+    task = json_dumps(task_data, sort_keys=True)[:_RAG_QUERY_MAX_CHARS - len(prompt) - 1]
+    return f"{prompt} {task}"
+
 
-def with_retry(max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0, timeout: float = 30.0):
+def with_retry(max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0, timeout: float = 30.0,
+               max_delay: float = 60.0, name: Optional[str] = None):
     """
     Декоратор для retry логики с exponential backoff и timeout
     
@@ -28,21 +349,30 @@ def with_retry(max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0,
         delay: Начальная задержка между попытками (секунды)
         backoff: Множитель для exponential backoff
         timeout: Общий timeout для всех попыток (секунды)
+        max_delay: Верхняя граница задержки между попытками (секунды)
+        name: Имя операции в логах (по умолчанию имя оборачиваемой функции)
+    
+    Пауза перед попыткой случайно растягивается в 0.5-1.5 раза, чтобы агенты,
+    упавшие одновременно, не повторяли запросы синхронно. Если пауза не уложится
+    в оставшийся timeout, ошибка возвращается сразу, без бесполезного ожидания.
+    Ожидание только через asyncio.sleep: event loop не блокируется.
     """
     def decorator(func):
+        label = name or func.__name__
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            start_time = time.time()
+            start_time = time.monotonic()
             current_delay = delay
             
             for attempt in range(max_attempts):
                 # Проверяем общий timeout
-                if time.time() - start_time > timeout:
+                if time.monotonic() - start_time > timeout:
                     raise TimeoutError(f"Operation timed out after {timeout}s")
                 
                 try:
                     # Выполняем функцию с индивидуальным timeout
-                    remaining_timeout = timeout - (time.time() - start_time)
+                    remaining_timeout = timeout - (time.monotonic() - start_time)
                     if remaining_timeout <= 0:
                         raise TimeoutError("No time remaining for operation")
                     
@@ -50,79 +380,154 @@ def with_retry(max_attempts: int = 3, delay: float = 1.0, backoff: float = 2.0,
                     return result
                     
                 except (asyncio.TimeoutError, TimeoutError) as e:
-                    if attempt == max_attempts - 1:
-                        logger.error(f"Final timeout in {func.__name__} after {attempt + 1} attempts: {str(e)}")
-                        raise TimeoutError(f"Operation failed after {max_attempts} attempts: timeout")
+                    sleep_for = current_delay * random.uniform(0.5, 1.5)
+                    if attempt == max_attempts - 1 or time.monotonic() - start_time + sleep_for >= timeout:
+                        logger.error("Final timeout in %s after %d attempts: %s", label, attempt + 1, e)
+                        raise TimeoutError(f"Operation failed after {attempt + 1} attempts: timeout")
                     
-                    logger.warning(f"Timeout in {func.__name__} (attempt {attempt + 1}), retrying...")
+                    logger.warning("Timeout in %s (attempt %d), retrying...", label, attempt + 1)
                     
                 except Exception as e:
-                    if attempt == max_attempts - 1:
-                        logger.error(f"Final error in {func.__name__} after {attempt + 1} attempts: {str(e)}")
+                    sleep_for = current_delay * random.uniform(0.5, 1.5)
+                    if attempt == max_attempts - 1 or time.monotonic() - start_time + sleep_for >= timeout:
+                        # logging.exception берёт traceback из sys.exc_info() без ручного форматирования
+                        logger.exception("Final error in %s after %d attempts: %s", label, attempt + 1, e)
                         raise
                     
                     # Логируем ошибку и продолжаем
-                    logger.warning(f"Error in {func.__name__} (attempt {attempt + 1}): {str(e)}, retrying...")
+                    logger.warning("Error in %s (attempt %d): %s, retrying...", label, attempt + 1, e)
                 
-                # Ждем перед следующей попыткой (если это не последняя попытка)
-                if attempt < max_attempts - 1:
-                    await asyncio.sleep(current_delay)
-                    current_delay *= backoff
+                # Сюда попадаем только если следующая попытка успевает в timeout
+                await asyncio.sleep(sleep_for)
+                current_delay = min(current_delay * backoff, max_delay)
             
             # Этот код не должен выполняться, но на всякий случай
-            raise RuntimeError(f"Unexpected end of retry loop in {func.__name__}")
+            raise RuntimeError(f"Unexpected end of retry loop in {label}")
         
         return wrapper
     return decorator
 
 
+@dataclass(slots=True)
 class AgentMetrics:
     """Метрики производительности агента"""
     
-    def __init__(self):
-        self.tasks_processed = 0
-        self.tasks_successful = 0
-        self.tasks_failed = 0
-        self.total_processing_time = 0.0
-        self.last_activity = None
+    tasks_processed: int = 0
+    tasks_successful: int = 0
+    tasks_failed: int = 0
+    # Суммарное время в целых наносекундах: без накопления ошибки округления float
+    total_processing_time_ns: int = 0
+    last_activity: Optional[float] = None  # Unix timestamp (time.time())
+    # Доля успешных задач, обновляется инкрементально при каждой записи
+    success_rate: float = 0.0
+    # Ответы LLM, полученные из кэша, и сэкономленные на них токены
+    llm_cache_hits: int = 0
+    llm_tokens_saved: int = 0
+    # Задачи, для которых поиск по базе знаний пропущен как бесполезный
+    rag_skipped_count: int = 0
+    # Кэш to_dict(): сбрасывается при каждой записи метрик
+    _cached_view: Optional[Dict[str, Any]] = field(default=None, repr=False, compare=False)
     
     def record_task(self, success: bool, processing_time: float):
-        """Записываем метрики выполнения задачи"""
-        self.tasks_processed += 1
-        if success:
-            self.tasks_successful += 1
-        else:
-            self.tasks_failed += 1
-        self.total_processing_time += processing_time
-        self.last_activity = datetime.now()
+        """Записываем метрики выполнения задачи (время в секундах)"""
+        self.record_task_ns(success, int(processing_time * 1e9))
+    
+    def record_task_ns(self, success: bool, processing_time_ns: int, now: Optional[float] = None):
+        """
+        Записываем метрики выполнения задачи (время в наносекундах)
+        
+        Args:
+            now: Время завершения (time.time()), если вызывающий код уже прочитал часы
+        """
+        # Без ветвления: успех как 0/1 сразу попадает в оба счетчика
+        succeeded = int(bool(success))
+        self.tasks_processed = processed = self.tasks_processed + 1
+        self.tasks_successful += succeeded
+        self.tasks_failed += 1 - succeeded
+        self.success_rate += (succeeded - self.success_rate) / processed
+        self.total_processing_time_ns += processing_time_ns
+        self.last_activity = time.time() if now is None else now
+        self._cached_view = None
+    
+    def record_llm_cache_hit(self, tokens_saved: int):
+        """Записываем ответ LLM, полученный из кэша"""
+        self.llm_cache_hits += 1
+        self.llm_tokens_saved += tokens_saved
+        self._cached_view = None
+    
+    def record_rag_skip(self):
+        """Записываем пропущенный поиск по базе знаний"""
+        self.rag_skipped_count += 1
+        self._cached_view = None
+    
+    @property
+    def total_processing_time(self) -> float:
+        """Суммарное время обработки задач в секундах"""
+        return self.total_processing_time_ns / 1e9
     
     def get_success_rate(self) -> float:
         """Процент успешных задач"""
-        if self.tasks_processed == 0:
-            return 0.0
-        return self.tasks_successful / self.tasks_processed
+        return self.success_rate
     
     def get_avg_processing_time(self) -> float:
         """Среднее время обработки задачи"""
         if self.tasks_processed == 0:
             return 0.0
-        return self.total_processing_time / self.tasks_processed
+        return self.total_processing_time_ns / self.tasks_processed / 1e9
     
     def to_dict(self) -> Dict[str, Any]:
-        """Преобразование в словарь"""
-        return {
-            "tasks_processed": self.tasks_processed,
-            "tasks_successful": self.tasks_successful,
-            "tasks_failed": self.tasks_failed,
-            "success_rate": self.get_success_rate(),
-            "avg_processing_time": self.get_avg_processing_time(),
-            "last_activity": self.last_activity.isoformat() if self.last_activity else None
-        }
+        """Преобразование в словарь (кэшируется до следующей записи метрик, не изменяйте результат)"""
+        view = self._cached_view
+        if view is None:
+            # Снимок счетчиков в локальные переменные: по одному чтению атрибута на поле
+            processed = self.tasks_processed
+            last_activity = self.last_activity
+            view = self._cached_view = {
+                "tasks_processed": processed,
+                "tasks_successful": self.tasks_successful,
+                "tasks_failed": self.tasks_failed,
+                "success_rate": self.success_rate,
+                "avg_processing_time": self.total_processing_time_ns / processed / 1e9 if processed else 0.0,
+                "last_activity": datetime.fromtimestamp(last_activity).isoformat() if last_activity else None,
+                "llm_cache_hits": self.llm_cache_hits,
+                "llm_tokens_saved": self.llm_tokens_saved,
+                "rag_skipped_count": self.rag_skipped_count
+            }
+        return view
+
+
+@dataclass(slots=True)
+class BundledData:
+    """Результаты параллельного запроса данных у провайдера"""
+    
+    seo_data: Any = None
+    client_data: Any = None
+    competitive_data: Any = None
+    errors: Dict[str, str] = field(default_factory=dict)
 
 
 class BaseAgent(ABC):
     """Базовый класс для всех AI-агентов с поддержкой MCP, retries и timeouts"""
     
+    # Все живые агенты процесса (для сводных метрик); не удерживает агентов от сборки мусора
+    _REGISTRY: "weakref.WeakSet[BaseAgent]" = weakref.WeakSet()
+    
+    # Общий для всех агентов лимит параллельных запросов к провайдерам: при всплеске
+    # задач не даёт N задач x M запросов перегрузить пул соединений провайдера.
+    # Semaphore привязывается к event loop, поэтому пересоздаётся при смене loop
+    _PROVIDER_GATE: Optional[asyncio.Semaphore] = None
+    _PROVIDER_GATE_LOOP: Optional[asyncio.AbstractEventLoop] = None
+    
+    # Аналогичный лимит OPENAI_MAX_CONCURRENCY для вызовов OpenAI
+    _OPENAI_GATE: Optional[asyncio.Semaphore] = None
+    _OPENAI_GATE_LOOP: Optional[asyncio.AbstractEventLoop] = None
+    _OPENAI_IN_FLIGHT: int = 0
+    
+    # Системный промпт наследника не зависит от состояния агента и может кэшироваться.
+    # Переопределенный get_system_prompt по умолчанию вызывается на каждый запрос
+    # (например, промпт TaskCoordinationAgent показывает текущую загрузку агентов)
+    STATIC_SYSTEM_PROMPT: bool = False
+    
     def __init__(self, 
                  agent_id: str,
                  name: str,
@@ -138,11 +543,21 @@ class BaseAgent(ABC):
                  retry_backoff: float = 2.0,
                  task_timeout: float = 30.0,
                  data_timeout: float = 15.0,
+                 # Внешний TTL кэш данных провайдера (например, api.database.redis_client.CacheManager)
+                 data_cache=None,
+                 data_cache_ttl: int = 3600,
+                 # Бэкенд кэша ответов LLM (тот же интерфейс, что у data_cache); по умолчанию процессный LRU
+                 llm_cache=None,
+                 # Кэш планов задач по template_id (core.plan_cache.PlanCache); по умолчанию выключен
+                 plan_cache=None,
                  **kwargs):  # Принимаем дополнительные параметры
         self.agent_id = agent_id
         self.name = name
         self.agent_level = agent_level
-        self.data_provider = data_provider
+        # Тип и возможности зависят только от класса и имени: вычисляем один раз
+        self._agent_type = self._agent_type_for(name)
+        self._capabilities = self._agent_capabilities_for(name)
+        self.data_provider = data_provider  # Через setter: заодно вычисляет маску возможностей
         self.model_name = model_name or "gpt-4o-mini"
         self.knowledge_base = knowledge_base
         self.context = {}
@@ -150,7 +565,21 @@ class BaseAgent(ABC):
         self.mcp_enabled = mcp_enabled
         self.mcp_context = {}
         self.rag_enabled = rag_enabled
-        self.knowledge_context = ""  # Контекст знаний для текущей задачи
+        self.knowledge_context: str = ""  # Контекст знаний для текущей задачи (всегда str)
+        self._knowledge_manager = None  # Заполняется в _initialize_rag_knowledge
+        # blake2b(query) + k -> (time.monotonic() записи, контекст)
+        self._knowledge_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.data_cache = data_cache
+        self.data_cache_ttl = data_cache_ttl
+        self._llm_cache = LLMCache(backend=llm_cache)
+        self.plan_cache = plan_cache
+        # Системный промпт и статический префикс пользовательского промпта
+        # (вычисляются при первом вызове LLM, после __init__ наследника)
+        self._system_prompt: Optional[str] = None
+        self._prompt_prefix: Optional[str] = None
+        # Хук метрик потокового ответа: вызывается со временем до первого токена (секунды)
+        self._on_first_token: Optional[Callable[[float], None]] = None
+        self.log = AgentLoggerAdapter(logger, {"agent_id": agent_id})
         
         # Retry и timeout конфигурация
         self.retry_config = {
@@ -160,9 +589,14 @@ class BaseAgent(ABC):
             "task_timeout": task_timeout,
             "data_timeout": data_timeout
         }
+        # process_task с retry политикой агента (см. _retry_policy): собирается при первой
+        # задаче и пересобирается только после изменения retry_config
+        self._retry_policy_key: Optional[tuple] = None
+        self._retry_policy_impl: Optional[Callable] = None
         
         # Дополнительные параметры сохраняем в context
-        self.context.update(kwargs)
+        if kwargs:
+            self.context.update(kwargs)
         
         # Инициализация MCP контекста если включен
         if self.mcp_enabled:
@@ -174,6 +608,61 @@ class BaseAgent(ABC):
             
         # Инициализация OpenAI клиента
         self._initialize_openai_client()
+        
+        BaseAgent._REGISTRY.add(self)
+    
+    @classmethod
+    def aggregate_metrics(cls, agents=None) -> Dict[str, Any]:
+        """
+        Сводные метрики по группе агентов (векторно через NumPy)
+        
+        Args:
+            agents: Агенты для агрегации (по умолчанию все живые экземпляры cls)
+            
+        Returns:
+            Dict с суммарными и средними метриками
+        """
+        if agents is None:
+            agents = [agent for agent in cls._REGISTRY if isinstance(agent, cls)]
+        else:
+            agents = list(agents)
+        count = len(agents)
+        
+        successful = np.fromiter((a.metrics.tasks_successful for a in agents), dtype=np.int64, count=count)
+        failed = np.fromiter((a.metrics.tasks_failed for a in agents), dtype=np.int64, count=count)
+        total_time_ns = np.fromiter((a.metrics.total_processing_time_ns for a in agents), dtype=np.int64, count=count)
+        
+        processed = successful + failed
+        active = processed > 0
+        success_rates = successful[active] / processed[active]
+        tasks_total = int(processed.sum())
+        
+        return {
+            "agents_count": count,
+            "active_agents": int(active.sum()),
+            "tasks_processed": tasks_total,
+            "tasks_successful": int(successful.sum()),
+            "tasks_failed": int(failed.sum()),
+            "success_rate": float(successful.sum() / tasks_total) if tasks_total else 0.0,
+            "avg_processing_time": float(total_time_ns.sum() / tasks_total / 1e9) if tasks_total else 0.0,
+            "min_agent_success_rate": float(success_rates.min()) if success_rates.size else 0.0,
+            "mean_agent_success_rate": float(success_rates.mean()) if success_rates.size else 0.0
+        }
+    
+    @property
+    def data_provider(self):
+        """Провайдер данных агента"""
+        return self._data_provider
+    
+    @data_provider.setter
+    def data_provider(self, data_provider):
+        self._data_provider = data_provider
+        # Методы провайдера связываются один раз при назначении, а не ищутся на каждый вызов
+        self._fetch_seo = _provider_method(data_provider, "get_seo_data")
+        self._fetch_client = _provider_method(data_provider, "get_client_data")
+        self._fetch_competitive = _provider_method(data_provider, "get_competitive_data")
+        self._provider_health = _provider_method(data_provider, "health_check")
+        self._provider_stats = _provider_method(data_provider, "get_stats")
     
     async def process_task_with_retry(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -185,23 +674,26 @@ class BaseAgent(ABC):
         Returns:
             Dict с результатами обработки
         """
-        start_time = time.time()
-        
-        # Применяем retry с конфигурацией агента
-        retry_decorator = with_retry(
-            max_attempts=self.retry_config["max_attempts"],
-            delay=self.retry_config["delay"],
-            backoff=self.retry_config["backoff"],
-            timeout=self.retry_config["task_timeout"]
-        )
+        start_ns = time.perf_counter_ns()
+        # task_data не проверяется до try: ошибки формата возвращаются структурированным ответом
+        task_token = current_task_id.set(task_data.get("task_id") if isinstance(task_data, dict) else None)
         
         try:
-            # Выполняем задачу с retry логикой
-            result = await retry_decorator(self.process_task)(task_data)
+            # Задачи с template_id могут взять готовый план из кэша планов
+            template_id = task_data.get("template_id") if self.plan_cache is not None else None
+            result = await self.plan_cache.get(template_id, task_data) if template_id else None
+            if result is not None:
+                result["plan_cache_hit"] = True
+            else:
+                # Выполняем задачу с retry логикой
+                result = await self._retry_policy()(self, task_data)
+                if template_id:
+                    await self.plan_cache.put(template_id, task_data, result)
             
             # Записываем успешные метрики
-            processing_time = time.time() - start_time
-            self.metrics.record_task(True, processing_time)
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            self.metrics.record_task_ns(True, elapsed_ns)
+            processing_time = elapsed_ns / 1e9
             
             # Добавляем метаданные в результат
             if isinstance(result, dict):
@@ -215,10 +707,11 @@ class BaseAgent(ABC):
             
         except Exception as e:
             # Записываем метрики ошибки
-            processing_time = time.time() - start_time
-            self.metrics.record_task(False, processing_time)
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            self.metrics.record_task_ns(False, elapsed_ns)
+            processing_time = elapsed_ns / 1e9
             
-            logger.error(f"Task failed in agent {self.agent_id} after retries: {str(e)}")
+            self.log.error("Task failed in agent %s after retries: %s", self.agent_id, e)
             
             # Возвращаем структурированный ответ об ошибке
             return {
@@ -227,21 +720,37 @@ class BaseAgent(ABC):
                 "error": str(e),
                 "error_type": type(e).__name__,
                 "processing_time": processing_time,
-                "timestamp": datetime.now().isoformat()
+                # То же чтение часов, что и last_activity в record_task
+                "timestamp": datetime.fromtimestamp(self.metrics.last_activity).isoformat()
             }
+        finally:
+            current_task_id.reset(task_token)
+    
+    @property
+    def openai_client(self) -> Optional[openai.AsyncOpenAI]:
+        """OpenAI клиент: общий клиент текущего event loop или явно назначенный агенту"""
+        client = self._openai_client
+        if client is _SHARED_OPENAI_CLIENT:
+            return _get_openai_client(_openai_api_key())
+        return client
+    
+    @openai_client.setter
+    def openai_client(self, client: Optional[openai.AsyncOpenAI]):
+        self._openai_client = client
     
     def _initialize_openai_client(self):
-        """Инициализация OpenAI клиента"""
+        """Инициализация OpenAI клиента (общий для всех агентов, отдельный на каждый event loop)"""
         try:
-            openai.api_key = os.getenv("OPENAI_API_KEY")
-            if not openai.api_key:
-                logger.warning(f"⚠️ OPENAI_API_KEY не установлен для агента {self.agent_id}")
+            api_key = _openai_api_key()
+            if not api_key:
+                self.log.warning("⚠️ OPENAI_API_KEY не установлен для агента %s", self.agent_id)
                 self.openai_client = None
             else:
-                self.openai_client = openai.AsyncOpenAI(api_key=openai.api_key)
-                logger.info(f"✅ OpenAI клиент инициализирован для {self.agent_id}")
+                # Сам клиент создается при первом обращении в рабочем event loop
+                self.openai_client = _SHARED_OPENAI_CLIENT
+                self.log.info("✅ OpenAI клиент инициализирован для %s", self.agent_id)
         except Exception as e:
-            logger.error(f"❌ Ошибка инициализации OpenAI для {self.agent_id}: {e}")
+            self.log.error("❌ Ошибка инициализации OpenAI для %s: %s", self.agent_id, e)
             self.openai_client = None
     
     def get_system_prompt(self) -> str:
@@ -265,13 +774,42 @@ class BaseAgent(ABC):
 3. Форматируй ответ в JSON структуре
 4. Будь конкретен и предоставляй actionable insights"""
 
-    async def call_openai(self, messages: list, temperature: float = 0.7) -> Dict[str, Any]:
+    async def _stream_openai(self, messages: list, temperature: float) -> AsyncIterator[str]:
+        """
+        Потоковый вызов OpenAI: отдает фрагменты текста по мере генерации.
+        Слот лимита занят, пока поток не прочитан или не закрыт: вызывающий код
+        читает генератор через contextlib.aclosing, чтобы при досрочной остановке
+        слот и HTTP соединение освобождались сразу, а не при сборке мусора
+        """
+        async with self._openai_gate():
+            BaseAgent._OPENAI_IN_FLIGHT += 1
+            response = None
+            try:
+                response = await self.openai_client.chat.completions.create(
+                    model=self.model_name,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=4000,
+                    stream=True
+                )
+                async for chunk in response:
+                    if chunk.choices:
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            yield delta
+            finally:
+                BaseAgent._OPENAI_IN_FLIGHT -= 1
+                if response is not None:
+                    await response.close()
+    
+    async def call_openai(self, messages: list, temperature: float = 0.7, stream: bool = False) -> Dict[str, Any]:
         """
         Вызов OpenAI API с retry логикой
         
         Args:
             messages: Список сообщений для ChatGPT
             temperature: Параметр креативности (0.0-1.0)
+            stream: Получать ответ потоком (добавляет time_to_first_token в результат)
             
         Returns:
             Dict с ответом от OpenAI
@@ -283,17 +821,36 @@ class BaseAgent(ABC):
                 "content": "Mock response - OpenAI не доступен"
             }
         
+        # Кэшируются только детерминированные запросы (temperature == 0)
+        cache_key = self._llm_cache.cache_key(self.model_name, messages, temperature, stream=stream)
+        cached = await self._llm_cache.get(cache_key)
+        if cached is not None:
+            tokens_saved = cached.get("usage", {}).get("total_tokens", 0)
+            self.metrics.record_llm_cache_hit(tokens_saved)
+            self.log.info("💾 LLM cache hit для %s, tokens saved=%d", self.agent_id, tokens_saved)
+            return cached
+        
         try:
-            response = await self.openai_client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=4000
-            )
+            if stream:
+                result = await self._collect_openai_stream(messages, temperature)
+                await self._llm_cache.set(cache_key, result)
+                return result
+            
+            async with self._openai_gate():
+                BaseAgent._OPENAI_IN_FLIGHT += 1
+                try:
+                    response = await self.openai_client.chat.completions.create(
+                        model=self.model_name,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=4000
+                    )
+                finally:
+                    BaseAgent._OPENAI_IN_FLIGHT -= 1
             
             content = response.choices[0].message.content
             
-            return {
+            result = {
                 "success": True,
                 "content": content,
                 "model": self.model_name,
@@ -303,40 +860,56 @@ class BaseAgent(ABC):
                     "total_tokens": response.usage.total_tokens
                 }
             }
+            await self._llm_cache.set(cache_key, result)
+            return result
             
         except Exception as e:
-            logger.error(f"❌ OpenAI API ошибка для {self.agent_id}: {str(e)}")
+            self.log.error("❌ OpenAI API ошибка для %s: %s", self.agent_id, e)
             return {
                 "success": False,
                 "error": str(e),
                 "content": f"Ошибка вызова OpenAI: {str(e)}"
             }
+    
+    async def _collect_openai_stream(self, messages: list, temperature: float) -> Dict[str, Any]:
+        """Собирает потоковый ответ целиком, замеряя время до первого токена"""
+        start = time.perf_counter()
+        time_to_first_token = None
+        parts = []
+        async with aclosing(self._stream_openai(messages, temperature)) as stream:
+            async for delta in stream:
+                if time_to_first_token is None:
+                    time_to_first_token = time.perf_counter() - start
+                    if self._on_first_token is not None:
+                        self._on_first_token(time_to_first_token)
+                parts.append(delta)
+        
+        return {
+            "success": True,
+            "content": "".join(parts),
+            "model": self.model_name,
+            # Потоковый ответ не содержит статистики токенов
+            "usage": {},
+            "time_to_first_token": time_to_first_token
+        }
 
-    async def process_with_llm(self, user_prompt: str, task_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def process_with_llm(self, user_prompt: str, task_data: Dict[str, Any],
+                               temperature: float = 0.7) -> Dict[str, Any]:
         """
         Обработка задачи с помощью LLM
         
         Args:
             user_prompt: Промпт пользователя
             task_data: Данные задачи
+            temperature: Параметр креативности (при 0.0 ответ кэшируется, см. LLMCache)
             
         Returns:
             Dict с результатом обработки
         """
-        # Получаем контекст знаний если RAG включен
-        knowledge_context = ""
-        if self.rag_enabled:
-            query = f"{user_prompt} {str(task_data)}"
-            knowledge_context = await self.get_knowledge_context(query, k=3)
-        
-        # Формируем сообщения для ChatGPT
-        messages = [
-            {"role": "system", "content": self.get_system_prompt()},
-            {"role": "user", "content": self.format_prompt_with_rag(user_prompt, task_data)}
-        ]
+        messages, knowledge_context = await self._build_llm_messages(user_prompt, task_data)
         
         # Вызываем OpenAI API
-        llm_response = await self.call_openai(messages)
+        llm_response = await self.call_openai(messages, temperature=temperature)
         
         if llm_response["success"]:
             return {
@@ -349,13 +922,116 @@ class BaseAgent(ABC):
                 "timestamp": datetime.now().isoformat()
             }
         else:
-            return {
-                "success": False,
-                "agent": self.agent_id,
-                "error": llm_response["error"],
-                "fallback_result": f"Fallback ответ для {self.name}: задача требует ручной обработки",
-                "timestamp": datetime.now().isoformat()
-            }
+            return self._llm_failure(llm_response["error"])
+    
+    def _llm_failure(self, error: str) -> Dict[str, Any]:
+        """Структурированный результат неудачной обработки задачи через LLM"""
+        return {
+            "success": False,
+            "agent": self.agent_id,
+            "error": error,
+            "fallback_result": f"Fallback ответ для {self.name}: задача требует ручной обработки",
+            "timestamp": datetime.now().isoformat()
+        }
+
+    async def process_with_llm_stream(self, user_prompt: str, task_data: Dict[str, Any],
+                                      temperature: float = 0.7) -> AsyncIterator[Union[str, Dict[str, Any]]]:
+        """
+        Потоковая обработка задачи с помощью LLM
+        
+        Читайте через contextlib.aclosing: при досрочной остановке поток OpenAI
+        и слот лимита OPENAI_MAX_CONCURRENCY освобождаются сразу.
+        
+        Args:
+            user_prompt: Промпт пользователя
+            task_data: Данные задачи
+            temperature: Параметр креативности (0.0-1.0)
+            
+        Yields:
+            str: Фрагменты ответа по мере генерации
+            Dict: При ошибке OpenAI - последний элемент, результат с success=False
+                  (как у process_with_llm)
+        """
+        if not self.openai_client:
+            yield f"Fallback ответ для {self.name}: задача требует ручной обработки"
+            return
+        
+        messages, _ = await self._build_llm_messages(user_prompt, task_data)
+        start = time.perf_counter()
+        first = True
+        try:
+            async with aclosing(self._stream_openai(messages, temperature)) as stream:
+                async for delta in stream:
+                    if first:
+                        first = False
+                        if self._on_first_token is not None:
+                            self._on_first_token(time.perf_counter() - start)
+                    yield delta
+        except Exception as e:
+            self.log.error("❌ OpenAI stream ошибка для %s: %s", self.agent_id, e)
+            yield self._llm_failure(str(e))
+    
+    def _get_cached_system_prompt(self) -> str:
+        """
+        Системный промпт агента: кэшируется, если get_system_prompt не переопределен
+        или класс объявил STATIC_SYSTEM_PROMPT = True
+        """
+        cls = type(self)
+        if not cls.STATIC_SYSTEM_PROMPT and cls.get_system_prompt is not BaseAgent.get_system_prompt:
+            return self.get_system_prompt()
+        prompt = self._system_prompt
+        if prompt is None:
+            prompt = self._system_prompt = self.get_system_prompt()
+        return prompt
+    
+    def invalidate_system_prompt(self):
+        """Сброс кэша системного промпта (после изменения данных, из которых он строится)"""
+        self._system_prompt = None
+    
+    async def _build_llm_messages(self, user_prompt: str, task_data: Dict[str, Any]) -> tuple:
+        """Сообщения для ChatGPT и использованный контекст знаний"""
+        # Получаем контекст знаний если RAG включен
+        knowledge_context = ""
+        if self.rag_enabled:
+            # Пустые данные задачи не добавляются в запрос, но сами по себе поиск не отменяют:
+            # развернутый промпт без данных задачи тоже находит полезный контекст
+            query = _rag_query(user_prompt, task_data) if task_data else user_prompt.strip()
+            if user_prompt.strip().lower() in _RAG_SKIP_PROMPTS or len(query) < _RAG_MIN_PROMPT_CHARS:
+                # Служебная команда или слишком короткий запрос: поиск не даст полезного контекста
+                self.metrics.record_rag_skip()
+                self.knowledge_context = ""
+            else:
+                knowledge_context = await self.get_knowledge_context(query, k=3)
+        
+        # Формируем сообщения для ChatGPT
+        messages = [
+            {"role": "system", "content": self._get_cached_system_prompt()},
+            {"role": "user", "content": self.format_prompt_with_rag(user_prompt, task_data)}
+        ]
+        return messages, knowledge_context
+
+    def _retry_policy(self) -> Callable:
+        """
+        process_task с retry политикой из текущего self.retry_config.
+        Обертка кэшируется по значениям политики; оборачивается функция класса
+        _run_task (не bound метод), чтобы не создавать цикл ссылок на self
+        """
+        config = self.retry_config
+        key = (config["max_attempts"], config["delay"], config["backoff"], config["task_timeout"])
+        if key != self._retry_policy_key:
+            self._retry_policy_impl = with_retry(
+                max_attempts=key[0],
+                delay=key[1],
+                backoff=key[2],
+                timeout=key[3],
+                name="process_task"
+            )(BaseAgent._run_task)
+            self._retry_policy_key = key
+        return self._retry_policy_impl
+    
+    async def _run_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Вызов process_task через экземпляр (учитывает переопределения на экземпляре, в т.ч. моки)"""
+        return await self.process_task(task_data)
 
     @abstractmethod
     async def process_task(self, task_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -374,67 +1050,185 @@ class BaseAgent(ABC):
         """
         pass
     
+    async def _cached(self, namespace: str, key_parts: tuple, loader):
+        """
+        Чтение через внешний TTL кэш (Redis): при промахе вызывает loader()
+        и сохраняет результат на data_cache_ttl секунд
+        
+        Pydantic модели хранятся строкой JSON (model_dump_json / model_validate_json):
+        кодирование и разбор выполняет pydantic-core без промежуточного dict.
+        """
+        if self.data_cache is None or self.data_provider is None:
+            return await loader()
+        
+        cache_key = f"agent_data:v2:{namespace}:" + json_dumps(key_parts, sort_keys=True)
+        cached = await self.data_cache.get(cache_key)
+        if cached is not None:
+            model = _CACHEABLE_MODELS.get(cached.get("model"))
+            return model.model_validate_json(cached["data"]) if model else cached["data"]
+        
+        value = await loader()
+        if type(value).__name__ in _CACHEABLE_MODELS:
+            payload = {"model": type(value).__name__, "data": value.model_dump_json()}
+        else:
+            payload = {"model": None, "data": value}
+        await self.data_cache.set(cache_key, payload, ttl=self.data_cache_ttl)
+        return value
+    
+    @staticmethod
+    def _provider_gate() -> asyncio.Semaphore:
+        """Semaphore лимита AGENT_PROVIDER_INFLIGHT для текущего event loop"""
+        loop = asyncio.get_running_loop()
+        if BaseAgent._PROVIDER_GATE_LOOP is not loop:
+            BaseAgent._PROVIDER_GATE = asyncio.Semaphore(_PROVIDER_INFLIGHT)
+            BaseAgent._PROVIDER_GATE_LOOP = loop
+        return BaseAgent._PROVIDER_GATE
+    
+    @staticmethod
+    def _openai_gate() -> asyncio.Semaphore:
+        """Semaphore лимита OPENAI_MAX_CONCURRENCY для текущего event loop"""
+        loop = asyncio.get_running_loop()
+        if BaseAgent._OPENAI_GATE_LOOP is not loop:
+            BaseAgent._OPENAI_GATE = asyncio.Semaphore(_OPENAI_INFLIGHT)
+            BaseAgent._OPENAI_GATE_LOOP = loop
+        return BaseAgent._OPENAI_GATE
+    
     @with_retry()
+    async def _provider_call(self, namespace: str, key_parts: tuple, loader):
+        """
+        Единая точка вызова провайдера данных: retry, timeout и внешний кэш
+        
+        Args:
+            namespace: Тип данных (seo, client, competitive) для ключа кэша
+            key_parts: Аргументы запроса для ключа кэша
+            loader: Фабрика корутины запроса к провайдеру (вызывается на каждую попытку)
+        """
+        async def gated_loader():
+            async with self._provider_gate():
+                return await loader()
+        
+        return await self._cached(namespace, key_parts, gated_loader)
+    
     async def get_seo_data(self, domain: str, parameters: Dict[str, Any] = None):
         """Получение SEO данных через провайдер с retry логикой (MCP-compatible)"""
-        return await self._get_seo_data_internal(domain, parameters)
+        return await self._provider_call(
+            "seo", (domain, parameters),
+            lambda: self._get_seo_data_internal(domain, parameters)
+        )
     
     async def _get_seo_data_internal(self, domain: str, parameters: Dict[str, Any] = None):
         """Внутренний метод получения SEO данных"""
-        if self.mcp_enabled and hasattr(self.data_provider, 'get_seo_data'):
-            return await self.data_provider.get_seo_data(domain, parameters or {})
-        elif hasattr(self.data_provider, 'get_seo_data'):
-            return await self.data_provider.get_seo_data(domain)
+        fetch = self._fetch_seo
+        if fetch is not None:
+            if self.mcp_enabled:
+                return await fetch(domain, parameters or _EMPTY_PARAMS)
+            return await fetch(domain)
         else:
             # Fallback для совместимости
-            return {"domain": domain, "source": "fallback", "status": "no_provider"}
+            return {"domain": domain, **_NO_PROVIDER_FALLBACK}
     
-    @with_retry()
     async def get_client_data(self, client_id: str, parameters: Dict[str, Any] = None):
         """Получение данных клиента через провайдер с retry логикой (MCP-compatible)"""
-        return await self._get_client_data_internal(client_id, parameters)
+        return await self._provider_call(
+            "client", (client_id, parameters),
+            lambda: self._get_client_data_internal(client_id, parameters)
+        )
     
     async def _get_client_data_internal(self, client_id: str, parameters: Dict[str, Any] = None):
         """Внутренний метод получения данных клиента"""
-        if self.mcp_enabled and hasattr(self.data_provider, 'get_client_data'):
-            return await self.data_provider.get_client_data(client_id, parameters or {})
-        elif hasattr(self.data_provider, 'get_client_data'):
-            return await self.data_provider.get_client_data(client_id)
+        fetch = self._fetch_client
+        if fetch is not None:
+            if self.mcp_enabled:
+                return await fetch(client_id, parameters or _EMPTY_PARAMS)
+            return await fetch(client_id)
         else:
             # Fallback для совместимости
-            return {"client_id": client_id, "source": "fallback", "status": "no_provider"}
+            return {"client_id": client_id, **_NO_PROVIDER_FALLBACK}
     
-    @with_retry()
     async def get_competitive_data(self, domain: str, competitors: list, parameters: Dict[str, Any] = None):
         """Получение конкурентных данных с retry логикой через MCP провайдер"""
-        return await self._get_competitive_data_internal(domain, competitors, parameters)
+        return await self._provider_call(
+            "competitive", (domain, competitors, parameters),
+            lambda: self._get_competitive_data_internal(domain, competitors, parameters)
+        )
     
     async def _get_competitive_data_internal(self, domain: str, competitors: list, parameters: Dict[str, Any] = None):
         """Внутренний метод получения конкурентных данных"""
-        if self.mcp_enabled and hasattr(self.data_provider, 'get_competitive_data'):
-            return await self.data_provider.get_competitive_data(domain, competitors, parameters or {})
+        if self.mcp_enabled and self._fetch_competitive is not None:
+            return await self._fetch_competitive(domain, competitors, parameters or _EMPTY_PARAMS)
         else:
             # Fallback данные для совместимости
-            return {
-                "domain": domain,
-                "competitors": competitors,
-                "source": "fallback",
-                "status": "mcp_not_available"
-            }
+            return {"domain": domain, "competitors": competitors, **_MCP_UNAVAILABLE_FALLBACK}
+    
+    async def fetch_bundle(self,
+                           domain: Optional[str] = None,
+                           client_id: Optional[str] = None,
+                           competitors: Optional[list] = None,
+                           parameters: Dict[str, Any] = None) -> BundledData:
+        """
+        Параллельное получение SEO, клиентских и конкурентных данных
+        
+        Запросы выполняются конкурентно через asyncio.gather, поэтому задержка
+        равна самому медленному запросу, а не их сумме. Ошибка одного запроса
+        не прерывает остальные и попадает в BundledData.errors.
+        
+        Args:
+            domain: Домен для SEO (и конкурентных, если заданы competitors) данных
+            client_id: ID клиента для клиентских данных
+            competitors: Список конкурентов
+            parameters: Дополнительные параметры запросов
+            
+        Returns:
+            BundledData с результатами запрошенных данных
+        """
+        requests = {}
+        if domain:
+            requests["seo_data"] = self.get_seo_data(domain, parameters)
+        if client_id:
+            requests["client_data"] = self.get_client_data(client_id, parameters)
+        if domain and competitors:
+            requests["competitive_data"] = self.get_competitive_data(domain, competitors, parameters)
+        
+        bundle = BundledData()
+        results = await asyncio.gather(*requests.values(), return_exceptions=True)
+        
+        for key, result in zip(requests, results):
+            if isinstance(result, Exception):
+                bundle.errors[key] = str(result)
+            else:
+                setattr(bundle, key, result)
+        
+        return bundle
+    
+    def get_liveness(self) -> Dict[str, Any]:
+        """Минимальный статус агента для частых liveness проверок"""
+        return {"agent_id": self.agent_id, "status": "healthy"}
     
-    def get_health_status(self) -> Dict[str, Any]:
-        """Информация о здоровье агента с retry конфигурацией"""
+    def get_health_status(self, *, include_metrics: bool = True, include_rag: bool = True) -> Dict[str, Any]:
+        """
+        Информация о здоровье агента с retry конфигурацией
+        
+        Args:
+            include_metrics: Включать метрики задач
+            include_rag: Включать статистику RAG (если RAG включен)
+        """
         health_status = {
             "agent_id": self.agent_id,
             "name": self.name,
             "agent_level": self.agent_level,
             "status": "healthy",
             "model": self.model_name,
-            "metrics": self.metrics.to_dict(),
             "mcp_enabled": self.mcp_enabled,
             "rag_enabled": self.rag_enabled,
-            "retry_config": self.retry_config
+            "retry_config": self.retry_config,
+            "openai_inflight": {
+                "limit": _OPENAI_INFLIGHT,
+                "in_flight": BaseAgent._OPENAI_IN_FLIGHT,
+                "saturated": BaseAgent._OPENAI_IN_FLIGHT >= _OPENAI_INFLIGHT
+            }
         }
+        if include_metrics:
+            health_status["metrics"] = self.metrics.to_dict()
         
         # Добавляем MCP статус если включен
         if self.mcp_enabled:
@@ -442,96 +1236,91 @@ class BaseAgent(ABC):
             health_status["data_provider_type"] = type(self.data_provider).__name__
         
         # Добавляем RAG статус если включен
-        if self.rag_enabled:
+        if include_rag and self.rag_enabled:
             health_status["rag_stats"] = self.get_rag_stats()
         
         return health_status
     
     async def _execute_with_metrics(self, task_func, *args, **kwargs):
         """Выполнение задачи с записью метрик"""
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
         success = False
+        error_result = None
         
         try:
             result = await task_func(*args, **kwargs)
             success = result.get('success', True)
             return result
         except Exception as e:
-            return {
+            error_result = {
                 "success": False,
                 "error": str(e),
-                "agent": self.agent_id,
-                "timestamp": datetime.now().isoformat()
+                "agent": self.agent_id
             }
+            return error_result
         finally:
-            end_time = datetime.now()
-            processing_time = (end_time - start_time).total_seconds()
-            self.metrics.record_task(success, processing_time)
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            now = time.time()
+            self.metrics.record_task_ns(success, elapsed_ns, now)
+            if error_result is not None:
+                # Время ошибки из того же чтения часов, что и last_activity
+                error_result["timestamp"] = datetime.fromtimestamp(now).isoformat()
     
     def _initialize_mcp_context(self):
         """Инициализация MCP контекста для агента"""
+        now = datetime.now()
         self.mcp_context = {
             "agent_id": self.agent_id,
             "agent_type": self._get_agent_type(),
             "capabilities": self._get_agent_capabilities(),
-            "preferences": {
-                "cache_enabled": True,
-                "real_time_updates": False,
-                "data_freshness_threshold": "1h"
-            },
-            "session_id": f"session_{self.agent_id}_{datetime.now().timestamp()}",
-            "initialized_at": datetime.now().isoformat()
+            # Копия: mcp_context уходит в JSON ответы и не должен содержать mappingproxy
+            "preferences": dict(_MCP_PREFERENCES),
+            "session_id": f"session_{self.agent_id}_{now.timestamp()}",
+            "initialized_at": now.isoformat()
         }
     
     def _get_agent_type(self) -> str:
         """Определение типа агента по имени класса"""
-        class_name = self.__class__.__name__.lower()
+        return self._agent_type
+    
+    def _get_agent_capabilities(self) -> list:
+        """Получение списка возможностей агента"""
+        return list(self._capabilities)
+    
+    # Тип и возможности зависят только от класса и имени агента, поэтому
+    # вычисляются один раз на пару (класс, имя), а не для каждого экземпляра
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _agent_type_for(cls, name: str) -> str:
+        class_name = cls.__name__.lower()
         
-        if "executive" in self.name.lower() or any(word in class_name for word in ["chief", "director", "executive"]):
+        if "executive" in name.lower() or any(word in class_name for word in ["chief", "director", "executive"]):
             return "executive"
         elif "manager" in class_name or "coordination" in class_name:
             return "management"  
         else:
             return "operational"
     
-    def _get_agent_capabilities(self) -> list:
-        """Получение списка возможностей агента"""
-        capabilities = ["basic_analysis"]
-        
-        # Определяем возможности на основе типа агента
-        agent_type = self._get_agent_type()
-        class_name = self.__class__.__name__.lower()
-        
-        if agent_type == "executive":
-            capabilities.extend(["strategic_planning", "enterprise_analysis", "roi_optimization"])
-        elif agent_type == "management":
-            capabilities.extend(["task_coordination", "performance_monitoring", "team_management"])
-        else:  # operational
-            capabilities.extend(["data_processing", "automated_analysis", "report_generation"])
-        
-        # Специфические возможности по названию агента
-        if "seo" in class_name:
-            capabilities.extend(["seo_analysis", "technical_audit", "keyword_research"])
-        if "content" in class_name:
-            capabilities.extend(["content_analysis", "content_strategy", "eeat_optimization"])
-        if "competitive" in class_name:
-            capabilities.extend(["competitive_analysis", "serp_analysis", "market_intelligence"])
-        if "sales" in class_name:
-            capabilities.extend(["lead_qualification", "sales_analysis", "proposal_generation"])
-        if "link" in class_name:
-            capabilities.extend(["link_analysis", "backlink_research", "outreach_automation"])
-        if "reporting" in class_name:
-            capabilities.extend(["business_intelligence", "data_visualization", "anomaly_detection"])
-        
-        return list(set(capabilities))  # Убираем дубликаты
+    @classmethod
+    @lru_cache(maxsize=None)
+    def _agent_capabilities_for(cls, name: str) -> tuple:
+        # Возможности уровня агента + специфические возможности по названию класса
+        capabilities = ["basic_analysis", *_LEVEL_CAPABILITIES[cls._agent_type_for(name)]]
+        class_name = cls.__name__.lower()
+        for keyword, extra in _CAPABILITY_KEYWORDS.items():
+            if keyword in class_name:
+                capabilities.extend(extra)
+        
+        # dict.fromkeys: дедупликация с сохранением порядка добавления
+        return tuple(dict.fromkeys(capabilities))
     
     async def get_mcp_health_status(self) -> Dict[str, Any]:
         """Получение статуса здоровья MCP провайдера"""
-        if not self.mcp_enabled or not hasattr(self.data_provider, 'health_check'):
+        if not self.mcp_enabled or self._provider_health is None:
             return {"status": "mcp_disabled"}
         
         try:
-            health_data = await self.data_provider.health_check()
+            health_data = await self._provider_health()
             return {
                 "status": "healthy",
                 "mcp_health": health_data,
@@ -549,23 +1338,23 @@ class BaseAgent(ABC):
         self.mcp_enabled = True
         self.data_provider = data_provider
         self._initialize_mcp_context()
-        print(f"✅ MCP включен для агента {self.agent_id}")
+        self.log.info("✅ MCP включен для агента %s", self.agent_id)
     
     def disable_mcp(self):
         """Отключение MCP для агента"""
         self.mcp_enabled = False
         self.mcp_context = {}
-        print(f"⚠️ MCP отключен для агента {self.agent_id}")
+        self.log.info("⚠️ MCP отключен для агента %s", self.agent_id)
     
     def get_mcp_stats(self) -> Dict[str, Any]:
         """Получение статистики MCP провайдера"""
-        if not self.mcp_enabled or not hasattr(self.data_provider, 'get_stats'):
+        if not self.mcp_enabled or self._provider_stats is None:
             return {"status": "mcp_disabled"}
         
         try:
             return {
                 "status": "enabled",
-                "provider_stats": self.data_provider.get_stats(),
+                "provider_stats": self._provider_stats(),
                 "agent_mcp_context": self.mcp_context
             }
         except Exception as e:
@@ -577,33 +1366,17 @@ class BaseAgent(ABC):
     def _initialize_rag_knowledge(self):
         """Инициализация RAG базы знаний с ChromaDB (исправленная версия)"""
         try:
-            # ИСПРАВЛЕНО: Прямой импорт ChromaDB модуля (избегаем FAISS legacy код)
-            import importlib.util
-            import os
-            
             # Проверяем что ChromaDB Knowledge Manager существует
-            chroma_km_path = os.path.join(os.path.dirname(__file__), '..', 'knowledge', 'chroma_knowledge_manager.py')
-            chroma_km_path = os.path.abspath(chroma_km_path)
-            
-            if not os.path.exists(chroma_km_path):
-                print(f"⚠️ ChromaDB Knowledge Manager не найден по пути {chroma_km_path}")
+            if not os.path.exists(_CHROMA_KM_PATH):
+                self.log.warning("⚠️ ChromaDB Knowledge Manager не найден по пути %s", _CHROMA_KM_PATH)
                 self.rag_enabled = False
                 return
             
-            # Прямой импорт ChromaDB модуля без legacy FAISS зависимостей
-            spec = importlib.util.spec_from_file_location("chroma_knowledge_manager", chroma_km_path)
-            chroma_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(chroma_module)
-            
-            # Получаем knowledge_manager из ChromaDB модуля
-            knowledge_manager = chroma_module.knowledge_manager
+            knowledge_manager = _get_knowledge_manager()
             
             # Проверяем конфигурацию RAG
-            from core.config import AIAgentsConfig
-            config = AIAgentsConfig()
-            
-            if not config.ENABLE_RAG:
-                print(f"⚠️ RAG отключен в конфигурации для {self.agent_id}")
+            if not _get_agents_config().ENABLE_RAG:
+                self.log.warning("⚠️ RAG отключен в конфигурации для %s", self.agent_id)
                 self.rag_enabled = False
                 return
                 
@@ -614,15 +1387,15 @@ class BaseAgent(ABC):
             )
             
             if vector_store:
-                print(f"✅ ChromaDB RAG база знаний загружена для {self.agent_id}")
+                self.log.info("✅ ChromaDB RAG база знаний загружена для %s", self.agent_id)
                 # Сохраняем ссылку на knowledge_manager для дальнейшего использования
                 self._knowledge_manager = knowledge_manager
             else:
-                print(f"⚠️ ChromaDB RAG база знаний не найдена для {self.agent_id}")
+                self.log.warning("⚠️ ChromaDB RAG база знаний не найдена для %s", self.agent_id)
                 self.rag_enabled = False
                 
         except Exception as e:
-            print(f"❌ Ошибка инициализации ChromaDB RAG для {self.agent_id}: {str(e)[:60]}...")
+            self.log.error("❌ Ошибка инициализации ChromaDB RAG для %s: %.60s...", self.agent_id, e)
             # НЕ показываем полный traceback чтобы избежать путаницы с FAISS ошибками
             self.rag_enabled = False
     
@@ -639,37 +1412,46 @@ class BaseAgent(ABC):
         """
         if not self.rag_enabled:
             return ""
+        
+        cache_key = f"{hashlib.blake2b(query.encode('utf-8'), digest_size=16).hexdigest()}:{k}"
+        now = time.monotonic()
+        cached = self._knowledge_cache.get(cache_key)
+        if cached is not None and now - cached[0] < _KNOWLEDGE_CACHE_TTL:
+            self._knowledge_cache.move_to_end(cache_key)
+            self.knowledge_context = cached[1]
+            return cached[1]
             
         try:
-            # Используем сохраненную ссылку на knowledge_manager или создаем новую
-            if hasattr(self, '_knowledge_manager'):
-                knowledge_manager = self._knowledge_manager
-            else:
-                # Fallback к прямому импорту ChromaDB модуля
-                import importlib.util
-                import os
-                
-                chroma_km_path = os.path.join(os.path.dirname(__file__), '..', 'knowledge', 'chroma_knowledge_manager.py')
-                chroma_km_path = os.path.abspath(chroma_km_path)
-                
-                spec = importlib.util.spec_from_file_location("chroma_knowledge_manager", chroma_km_path)
-                chroma_module = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(chroma_module)
-                
-                knowledge_manager = chroma_module.knowledge_manager
-                self._knowledge_manager = knowledge_manager
+            # Ссылку сохраняет _initialize_rag_knowledge; без нее база знаний агента не загружена
+            knowledge_manager = self._knowledge_manager
+            if knowledge_manager is None:
+                return ""
             
-            context = knowledge_manager.get_knowledge_context(
-                self.agent_id, 
-                query, 
-                k
-            )
+            # Эмбеддинг запроса считается общей пачкой с другими агентами
+            if getattr(knowledge_manager, "embeddings", None) is not None and hasattr(knowledge_manager, "embed_queries"):
+                query_embedding = await _EMBED_BATCHER.schedule(knowledge_manager.embed_queries, query)
+                context = knowledge_manager.get_knowledge_context(
+                    self.agent_id,
+                    query,
+                    k,
+                    query_embedding=query_embedding
+                )
+            else:
+                context = knowledge_manager.get_knowledge_context(
+                    self.agent_id, 
+                    query, 
+                    k
+                )
             
             self.knowledge_context = context
+            self._knowledge_cache[cache_key] = (now, context)
+            self._knowledge_cache.move_to_end(cache_key)
+            if len(self._knowledge_cache) > _KNOWLEDGE_CACHE_SIZE:
+                self._knowledge_cache.popitem(last=False)
             return context
             
         except Exception as e:
-            print(f"⚠️ Ошибка получения контекста знаний через ChromaDB для {self.agent_id}: {e}")
+            self.log.warning("⚠️ Ошибка получения контекста знаний через ChromaDB для %s: %s", self.agent_id, e)
             return ""
     
     def format_prompt_with_rag(self, user_prompt: str, task_data: Dict[str, Any]) -> str:
@@ -683,54 +1465,36 @@ class BaseAgent(ABC):
         Returns:
             str: Обогащенный промпт с контекстом знаний
         """
-        # Базовый промпт
-        enhanced_prompt = f"""
-Ты - {self.name}, специализированный AI-агент уровня {self.agent_level}.
-
-ЗАДАЧА:
-{user_prompt}
-
-ВХОДНЫЕ ДАННЫЕ:
-{task_data}
-"""
-
+        prefix = self._prompt_prefix
+        if prefix is None:
+            prefix = self._prompt_prefix = _PROMPT_HEADER.format(name=self.name, level=self.agent_level)
+        parts = [prefix, _PROMPT_TASK.format(prompt=user_prompt, task=_task_data_json(task_data))]
+        
         # Добавляем контекст знаний если есть
         if self.knowledge_context:
-            enhanced_prompt += f"""
-
-КОНТЕКСТ ЗНАНИЙ (используй эту информацию для более точного ответа):
-{self.knowledge_context}
-"""
-
-        enhanced_prompt += """
-
-ИНСТРУКЦИИ:
-1. Используй контекст знаний для формирования экспертного ответа
-2. Если контекст знаний релевантен - ссылайся на него
-3. Предоставь детальный и профессиональный ответ
-4. Форматируй ответ в JSON структуре как ожидается
-
-ОТВЕТ:"""
-
-        return enhanced_prompt
+            parts.append(_PROMPT_KNOWLEDGE.format(context=self.knowledge_context))
+        
+        parts.append(_PROMPT_FOOTER)
+        return "".join(parts)
     
     def enable_rag(self):
         """Включение RAG для агента"""
         self.rag_enabled = True
         self._initialize_rag_knowledge()
-        print(f"✅ RAG включен для агента {self.agent_id}")
+        self.log.info("✅ RAG включен для агента %s", self.agent_id)
     
     def disable_rag(self):
         """Отключение RAG для агента"""
         self.rag_enabled = False
         self.knowledge_context = ""
-        print(f"⚠️ RAG отключен для агента {self.agent_id}")
+        self._knowledge_cache.clear()
+        self.log.info("⚠️ RAG отключен для агента %s", self.agent_id)
     
     def get_rag_stats(self) -> Dict[str, Any]:
         """Получение статистики RAG"""
         return {
             "rag_enabled": self.rag_enabled,
-            "knowledge_context_length": len(self.knowledge_context) if self.knowledge_context else 0,
+            "knowledge_context_length": len(self.knowledge_context),
             "agent_level": self.agent_level,
             "knowledge_base": self.knowledge_base
         }
@@ -3,11 +3,9 @@
 """
 
 import os
+from functools import lru_cache
 from typing import Dict, Any, Optional
-from dotenv import load_dotenv
-
-# Загружаем переменные окружения из .env файла
-load_dotenv()
+from config.env import bootstrap_env
 
 
 class AIAgentsConfig:
@@ -78,13 +76,23 @@ class AIAgentsConfig:
         return os.path.join(self.KNOWLEDGE_BASE_PATH, agent_level, knowledge_file)
 
 
-# Глобальный экземпляр конфигурации
-config = AIAgentsConfig()
+@lru_cache(maxsize=1)
+def get_config() -> AIAgentsConfig:
+    """Получить конфигурацию (единственный экземпляр на процесс)"""
+    # Загружаем переменные окружения из .env файла (один раз на дерево процессов)
+    bootstrap_env()
+    return AIAgentsConfig()
 
-def load_config():
+def load_config() -> AIAgentsConfig:
     """Загрузить конфигурацию"""
-    return config
+    return get_config()
+
+# Глобальный экземпляр конфигурации создается при первом обращении (PEP 562):
+# импорт модуля не читает .env и окружение
+def __getattr__(name: str) -> Any:
+    if name == "config":
+        return get_config()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def get_config():
-    """Получить конфигурацию"""
-    return config
+def __dir__():
+    return sorted(set(globals()) | {"config"})
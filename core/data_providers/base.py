@@ -4,32 +4,53 @@
 """
 
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import asyncio
 import logging
 import time
+from urllib.parse import urlsplit
+import numpy as np
 from core.interfaces.data_models import SEOData, ClientData, CompetitiveData  # УБРАЛИ DataSource
 
 logger = logging.getLogger(__name__)
 
+# Размер кольцевого буфера времен ответа провайдера (последние N вызовов)
+RESPONSE_TIME_WINDOW = 1024
 
+
+def normalize_domain(domain: str) -> str:
+    """
+    Каноническая форма домена для ключей кэша:
+    "https://www.Example.com/" и "example.com" дают "example.com"
+    """
+    value = domain.strip().lower()
+    netloc = urlsplit(value if "//" in value else "//" + value).netloc or value
+    return netloc.removeprefix("www.").rstrip(".")
+
+
+@dataclass(slots=True)
 class DataProviderMetrics:
     """Метрики производительности провайдера"""
 
-    def __init__(self):
-        self.calls_total = 0
-        self.calls_successful = 0
-        self.calls_failed = 0
-        self.avg_response_time = 0.0
-        self.total_api_cost = 0.0
-        self.cache_hits = 0
-        self.cache_misses = 0
-        self.last_error = None
-        self.last_error_time = None
+    calls_total: int = 0
+    calls_successful: int = 0
+    calls_failed: int = 0
+    total_api_cost: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    last_error: Optional[str] = None
+    last_error_time: Optional[datetime] = None
+    # Кольцевой буфер времен ответа: запись O(1), среднее и p95 считаются при чтении
+    _response_times: np.ndarray = field(
+        default_factory=lambda: np.zeros(RESPONSE_TIME_WINDOW, dtype=np.float32), repr=False
+    )
 
     def record_call(self, success: bool, response_time: float, api_cost: float = 0.0):
         """Записать метрики вызова"""
+        self._response_times[self.calls_total % RESPONSE_TIME_WINDOW] = response_time
         self.calls_total += 1
 
         if success:
@@ -37,14 +58,24 @@ class DataProviderMetrics:
         else:
             self.calls_failed += 1
 
-        # Экспоненциальное сглаживание для среднего времени ответа
-        alpha = 0.1
-        self.avg_response_time = (
-            alpha * response_time + (1 - alpha) * self.avg_response_time
-        )
-
         self.total_api_cost += api_cost
 
+    def _recent_response_times(self) -> np.ndarray:
+        """Заполненная часть буфера (последние до RESPONSE_TIME_WINDOW вызовов)"""
+        return self._response_times[:min(self.calls_total, RESPONSE_TIME_WINDOW)]
+
+    @property
+    def avg_response_time(self) -> float:
+        """Среднее время ответа по последним вызовам"""
+        recent = self._recent_response_times()
+        return float(recent.mean()) if recent.size else 0.0
+
+    @property
+    def p95_response_time(self) -> float:
+        """95-й перцентиль времени ответа по последним вызовам"""
+        recent = self._recent_response_times()
+        return float(np.percentile(recent, 95)) if recent.size else 0.0
+
     def record_error(self, error: str):
         """Записать ошибку"""
         self.last_error = error
@@ -81,6 +112,7 @@ class DataProviderMetrics:
             "calls_failed": self.calls_failed,
             "success_rate": self.success_rate,
             "avg_response_time": self.avg_response_time,
+            "p95_response_time": self.p95_response_time,
             "total_api_cost": self.total_api_cost,
             "cache_hits": self.cache_hits,
             "cache_misses": self.cache_misses,
@@ -101,7 +133,9 @@ class BaseDataProvider(ABC):
             config: Конфигурация провайдера
         """
         self.config = config
-        self.cache = {}
+        # LRU кэш с TTL: ключ -> (time.monotonic() истечения, данные)
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.cache_max = config.get("cache_max", 10_000)
         self.metrics = DataProviderMetrics()
         self.cache_ttl = config.get("cache_ttl", 3600)  # 1 час по умолчанию
         self.cache_enabled = config.get("cache_enabled", True)
@@ -175,10 +209,11 @@ class BaseDataProvider(ABC):
                 "provider_type": self.__class__.__name__,
                 "response_time": response_time,
                 "metrics": self.metrics.to_dict(),
-                "cache_size": len(self.cache),
+                "cache_size": self.cache_size(),
                 "config": {
                     "cache_enabled": self.cache_enabled,
                     "cache_ttl": self.cache_ttl,
+                    "cache_max": self.cache_max,
                     "retry_attempts": self.retry_attempts,
                     "timeout": self.timeout
                 },
@@ -221,26 +256,6 @@ class BaseDataProvider(ABC):
         key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
         return ":".join(key_parts)
 
-    def _is_cache_valid(self, cache_entry: Dict[str, Any]) -> bool:
-        """
-        Проверка валидности записи в кэше
-
-        Args:
-            cache_entry: Запись кэша с timestamp
-
-        Returns:
-            bool: True если запись валидна
-        """
-        if not self.cache_enabled:
-            return False
-
-        cache_time = cache_entry.get("timestamp")
-        if not cache_time:
-            return False
-
-        age = datetime.now() - cache_time
-        return age.total_seconds() < self.cache_ttl
-
     def _cache_get(self, cache_key: str) -> Optional[Any]:
         """
         Получение данных из кэша
@@ -255,10 +270,14 @@ class BaseDataProvider(ABC):
             return None
 
         cache_entry = self.cache.get(cache_key)
-        if cache_entry and self._is_cache_valid(cache_entry):
-            self.metrics.record_cache_hit()
-            logger.debug(f"💾 Cache hit: {cache_key}")
-            return cache_entry["data"]
+        if cache_entry is not None:
+            if cache_entry[0] > time.monotonic():
+                self.cache.move_to_end(cache_key)
+                self.metrics.record_cache_hit()
+                logger.debug(f"💾 Cache hit: {cache_key}")
+                return cache_entry[1]
+            # Запись устарела: освобождаем место сразу
+            del self.cache[cache_key]
 
         self.metrics.record_cache_miss()
         logger.debug(f"💨 Cache miss: {cache_key}")
@@ -275,12 +294,17 @@ class BaseDataProvider(ABC):
         if not self.cache_enabled:
             return
 
-        self.cache[cache_key] = {
-            "data": data,
-            "timestamp": datetime.now()
-        }
+        self.cache[cache_key] = (time.monotonic() + self.cache_ttl, data)
+        self.cache.move_to_end(cache_key)
+        # Вытесняем самые давно использованные записи сверх cache_max
+        while len(self.cache) > self.cache_max:
+            self.cache.popitem(last=False)
         logger.debug(f"💾 Cached: {cache_key}")
 
+    def cache_size(self) -> int:
+        """Количество записей в кэше провайдера"""
+        return len(self.cache)
+    
     def _cache_clear(self, pattern: Optional[str] = None) -> int:
         """
         Очистка кэша
@@ -3,7 +3,7 @@ Factory для создания и управления Data Providers
 Обеспечивает dependency injection и конфигурацию провайдеров
 """
 
-from typing import Dict, Any, List, Optional, Type
+from typing import Dict, Any, List, Optional, Tuple, Type
 import logging
 from enum import Enum
 from datetime import datetime
@@ -28,6 +28,11 @@ class DataProviderFactory:
     # Singleton instances для повторного использования
     _instances: Dict[str, BaseDataProvider] = {}
     
+    # Версия реестра: увеличивается при изменении экземпляров/классов провайдеров
+    # и инвалидирует кэш get_provider_info
+    _registry_version: int = 0
+    _provider_info_cache: Dict[ProviderType, Tuple[int, Dict[str, Any]]] = {}
+    
     # Mapping типов провайдеров к классам
     _provider_classes: Dict[ProviderType, Type[BaseDataProvider]] = {
         ProviderType.STATIC: StaticDataProvider,
@@ -132,6 +137,7 @@ class DataProviderFactory:
             # Сохраняем в singleton cache
             if singleton:
                 cls._instances[instance_key] = provider_instance
+                cls._registry_version += 1
             
             return provider_instance
             
@@ -160,16 +166,19 @@ class DataProviderFactory:
             if provider_type == ProviderType.MCP:
                 from core.data_providers.mcp_provider import MCPDataProvider
                 cls._provider_classes[ProviderType.MCP] = MCPDataProvider
+                cls._registry_version += 1
                 return MCPDataProvider
                 
             elif provider_type == ProviderType.HYBRID:
                 from core.data_providers.hybrid_provider import HybridDataProvider
                 cls._provider_classes[ProviderType.HYBRID] = HybridDataProvider
+                cls._registry_version += 1
                 return HybridDataProvider
                 
             elif provider_type == ProviderType.MOCK:
                 from core.data_providers.mock_provider import MockDataProvider
                 cls._provider_classes[ProviderType.MOCK] = MockDataProvider
+                cls._registry_version += 1
                 return MockDataProvider
                 
         except ImportError as e:
@@ -278,13 +287,18 @@ class DataProviderFactory:
             provider_type: Тип провайдера
             
         Returns:
-            Информация о провайдере
+            Информация о провайдере (снимок кэшируется до изменения реестра,
+            не изменяйте результат)
         """
         try:
             provider_type_enum = ProviderType(provider_type.lower())
         except ValueError:
             return {"error": f"Неизвестный тип провайдера: {provider_type}"}
         
+        cached = cls._provider_info_cache.get(provider_type_enum)
+        if cached is not None and cached[0] == cls._registry_version:
+            return cached[1]
+        
         info = {
             "type": provider_type_enum.value,
             "available": provider_type_enum in cls._provider_classes or cls._try_import_provider(provider_type_enum) is not None,
@@ -299,6 +313,8 @@ class DataProviderFactory:
         ]
         info["active_instances"] = len(active_instances)
         
+        # Версию читаем после сборки: _try_import_provider мог её увеличить
+        cls._provider_info_cache[provider_type_enum] = (cls._registry_version, info)
         return info
     
     @classmethod
@@ -367,6 +383,8 @@ class DataProviderFactory:
         
         for key in keys_to_remove:
             del cls._instances[key]
+        if keys_to_remove:
+            cls._registry_version += 1
         
         logger.info(f"🗑️ Удалено {len(keys_to_remove)} экземпляров провайдеров")
         return len(keys_to_remove)
@@ -385,6 +403,7 @@ class DataProviderFactory:
             provider_class: Класс провайдера
         """
         cls._provider_classes[provider_type] = provider_class
+        cls._registry_version += 1
         logger.info(f"📝 Зарегистрирован класс {provider_class.__name__} для {provider_type.value}")
 
 
@@ -11,7 +11,7 @@ import logging
 import time
 import json
 
-from core.data_providers.base import BaseDataProvider
+from core.data_providers.base import BaseDataProvider, normalize_domain
 from core.interfaces.data_models import SEOData, ClientData, CompetitiveData, DataSource
 
 logger = logging.getLogger(__name__)
@@ -207,7 +207,7 @@ class StaticDataProvider(BaseDataProvider):
         """
         await self._ensure_initialized()
         start_time = time.time()
-        cache_key = self._get_cache_key("seo_data", domain, **kwargs)
+        cache_key = self._get_cache_key("seo_data", normalize_domain(domain), **kwargs)
         
         try:
             # Проверяем кэш
@@ -523,7 +523,9 @@ class StaticDataProvider(BaseDataProvider):
         """Конкурентный анализ через SEO AI Models"""
         await self._ensure_initialized()
         start_time = time.time()
-        cache_key = self._get_cache_key("competitive_data", domain, *competitors, **kwargs)
+        cache_key = self._get_cache_key(
+            "competitive_data", normalize_domain(domain), *map(normalize_domain, competitors), **kwargs
+        )
         
         try:
             # Проверяем кэш
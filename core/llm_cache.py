@@ -0,0 +1,121 @@
+"""
+Кэш ответов LLM для AI SEO Architects
+Детерминированные вызовы (temperature == 0) с одинаковыми сообщениями
+возвращаются из кэша без сетевого запроса и без расхода токенов
+"""
+
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from core.util import json_dumps
+
+
+class InMemoryLRUBackend:
+    """
+    Процессный LRU бэкенд с TTL (для разработки и тестов)
+
+    Интерфейс совпадает с api.database.redis_client.CacheManager:
+    async get(key) / async set(key, value, ttl=...)
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        # key -> (time.monotonic() истечения, значение)
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Получение значения; просроченная запись удаляется"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: int = 3600) -> bool:
+        """Сохранение значения с вытеснением самой старой записи"""
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LLMCache:
+    """Кэш ответов chat completions с подключаемым бэкендом"""
+
+    KEY_PREFIX = "llm_cache:v1:"
+
+    def __init__(self, backend=None, ttl: int = 3600, max_entries: int = 256):
+        """
+        Args:
+            backend: Внешний кэш (например, CacheManager на Redis); по умолчанию процессный LRU
+            ttl: Время жизни записи в секундах
+            max_entries: Размер процессного LRU (если backend не передан)
+        """
+        self.backend = backend if backend is not None else InMemoryLRUBackend(max_entries)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def cache_key(self, model: str, messages: List[Dict[str, Any]],
+                  temperature: float, tools: Optional[list] = None,
+                  stream: bool = False) -> Optional[str]:
+        """
+        Ключ кэша для запроса или None, если ответ недетерминирован (temperature != 0)
+
+        Потоковые и обычные ответы хранятся под разными ключами: у потокового
+        нет статистики токенов, но есть time_to_first_token
+        """
+        if temperature != 0:
+            return None
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": float(temperature),  # 0 и 0.0 дают один ключ
+            "tools": tools,
+            "stream": stream
+        }
+        digest = hashlib.sha256(json_dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+        return self.KEY_PREFIX + digest
+
+    async def get(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Копия сохраненного ответа или None
+
+        Процессный бэкенд хранит объекты без сериализации, поэтому и при записи,
+        и при чтении используются глубокие копии: изменения ответа вызывающим
+        кодом не попадают в кэш
+        """
+        if key is None:
+            return None
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(value)
+
+    async def set(self, key: Optional[str], response: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """Сохранение ответа (без ключа ничего не делает)"""
+        if key is None:
+            return
+        await self.backend.set(key, copy.deepcopy(response), ttl=self.ttl if ttl is None else ttl)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика попаданий"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "backend": type(self.backend).__name__
+        }
@@ -30,6 +30,8 @@ class MCPDataProvider:
             "errors": 0,
             "response_times": []
         }
+        # Fallback StaticDataProvider создаются лениво при первом обращении и переиспользуются
+        self._static_providers: Dict[str, Any] = {}
         
     async def initialize(self) -> bool:
         """Инициализация всех MCP клиентов"""
@@ -436,18 +438,30 @@ class MCPDataProvider:
         )
     
     # Fallback методы через StaticDataProvider с SEO AI Models
+    def _get_static_provider(self, kind: str, static_config: Dict[str, Any]):
+        """
+        Ленивое создание fallback StaticDataProvider
+        
+        Провайдер строится при первом fallback-запросе данного типа и далее
+        переиспользуется, чтобы не загружать SEO AI Models на каждый вызов.
+        """
+        provider = self._static_providers.get(kind)
+        if provider is None:
+            from core.data_providers.static_provider import StaticDataProvider
+            provider = StaticDataProvider(static_config)
+            self._static_providers[kind] = provider
+        return provider
+    
     async def _get_static_seo_data(self, domain: str, parameters: Dict[str, Any] = None) -> SEOData:
         """Fallback на StaticDataProvider для SEO данных"""
         try:
-            from core.data_providers.static_provider import StaticDataProvider
-            
             static_config = {
                 "mock_mode": False,  # Используем реальные SEO AI Models
                 "seo_ai_models_path": "./seo_ai_models/",
                 "cache_ttl_minutes": 30
             }
             
-            provider = StaticDataProvider(static_config)
+            provider = self._get_static_provider("seo", static_config)
             return await provider.get_seo_data(domain, **(parameters or {}))
             
         except Exception as e:
@@ -464,10 +478,8 @@ class MCPDataProvider:
     async def _get_static_client_data(self, client_id: str, parameters: Dict[str, Any] = None) -> ClientData:
         """Fallback на StaticDataProvider для клиентских данных"""
         try:
-            from core.data_providers.static_provider import StaticDataProvider
-            
             static_config = {"mock_mode": True}  # Для клиентских данных используем mock
-            provider = StaticDataProvider(static_config)
+            provider = self._get_static_provider("client", static_config)
             return await provider.get_client_data(client_id, **(parameters or {}))
             
         except Exception as e:
@@ -482,13 +494,11 @@ class MCPDataProvider:
     async def _get_static_competitive_data(self, domain: str, competitors: List[str], parameters: Dict[str, Any] = None) -> CompetitiveData:
         """Fallback на StaticDataProvider для конкурентных данных"""
         try:
-            from core.data_providers.static_provider import StaticDataProvider
-            
             static_config = {
                 "mock_mode": False,  # Используем SEO AI Models для конкурентного анализа
                 "seo_ai_models_path": "./seo_ai_models/"
             }
-            provider = StaticDataProvider(static_config)
+            provider = self._get_static_provider("competitive", static_config)
             return await provider.get_competitive_data(domain, competitors, **(parameters or {}))
             
         except Exception as e:
@@ -0,0 +1,234 @@
+"""
+Кэш планов (шаблонов результатов) задач агентов
+Задачи одного шаблона с разными доменами/клиентами используют общий план:
+значения слотов (domain, client_id, ...) при сохранении заменяются метками,
+а при попадании в кэш подставляются значения новой задачи.
+Заменяются только значения целиком и только под ключами с именем слота;
+план, в котором значение слота встречается где-то еще, не кэшируется
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, Any, Optional, Tuple
+
+from core.util import json_dumps
+
+logger = logging.getLogger(__name__)
+
+# Поля задачи с высокой кардинальностью: не входят в отпечаток, а становятся слотами
+DEFAULT_SLOT_FIELDS = ("domain", "client_id", "company_name", "website", "url")
+# Служебные поля задачи, не влияющие на план
+DEFAULT_IGNORED_FIELDS = ("task_id", "template_id", "timestamp", "created_at")
+
+_SLOT_MARKER = "{{slot:%s}}"
+# Значения слотов короче этого (и числовые) не шаблонизируются, а входят в отпечаток
+_MIN_SLOT_VALUE_LENGTH = 4
+
+
+def _normalize(value: Any) -> Any:
+    """Нормализация входов для отпечатка: строки в нижнем регистре без пробелов по краям"""
+    if isinstance(value, str):
+        return value.strip().lower()
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _is_templatable(value: Any) -> bool:
+    """Слот можно шаблонизировать: нечисловая строка достаточной длины"""
+    if not isinstance(value, str):
+        return False
+    stripped = value.strip()
+    if len(stripped) < _MIN_SLOT_VALUE_LENGTH:
+        return False
+    try:
+        float(stripped)
+    except ValueError:
+        return True
+    return False
+
+
+def _to_template(value: Any, slots: Dict[str, str]) -> Any:
+    """Значения, целиком равные значению слота под ключом с его именем, заменяются меткой"""
+    if isinstance(value, dict):
+        return {
+            k: _SLOT_MARKER % k if k in slots and v == slots[k] else _to_template(v, slots)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [_to_template(v, slots) for v in value]
+    return value
+
+
+def _from_template(value: Any, markers: Dict[str, str]) -> Any:
+    """Подстановка значений новой задачи вместо меток слотов"""
+    if isinstance(value, str):
+        return markers.get(value, value)
+    if isinstance(value, dict):
+        return {k: _from_template(v, markers) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_from_template(v, markers) for v in value]
+    return value
+
+
+def _contains_value(value: Any, needle: str) -> bool:
+    """Встречается ли значение слота в структуре (в строках или ключах)"""
+    if isinstance(value, str):
+        return needle in value
+    if isinstance(value, dict):
+        return any(needle in str(k) or _contains_value(v, needle) for k, v in value.items())
+    if isinstance(value, list):
+        return any(_contains_value(v, needle) for v in value)
+    return str(value) == needle
+
+
+class PlanCache:
+    """Файловый кэш планов с TTL и ограничением общего размера"""
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 100 * 1024 * 1024,
+                 slot_fields: Tuple[str, ...] = DEFAULT_SLOT_FIELDS,
+                 required_keys: Tuple[str, ...] = ("success",)):
+        """
+        Args:
+            cache_dir: Каталог кэша (по умолчанию AGENT_PLAN_CACHE_DIR или ./data/plan_cache/)
+            ttl: Время жизни плана в секундах (по умолчанию 7 дней)
+            max_bytes: Ограничение общего размера кэша (по умолчанию 100 MB)
+            slot_fields: Поля задачи, значения которых подставляются в план
+            required_keys: Ключи, обязательные в результате для сохранения плана
+        """
+        self.cache_dir = cache_dir or os.getenv("AGENT_PLAN_CACHE_DIR", "./data/plan_cache/")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.slot_fields = slot_fields
+        self.required_keys = required_keys
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def fingerprint(self, template_id: str, task_data: Dict[str, Any]) -> str:
+        """
+        Отпечаток задачи: шаблон + нормализованные входы без шаблонизируемых слотов
+        и служебных полей (числовые и короткие значения слотов входят в отпечаток)
+        """
+        skipped = set(self._slots(task_data)) | set(DEFAULT_IGNORED_FIELDS)
+        inputs = {k: v for k, v in task_data.items() if k not in skipped}
+        payload = json_dumps({"template_id": template_id, "inputs": _normalize(inputs)}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _slots(self, task_data: Dict[str, Any]) -> Dict[str, str]:
+        """Шаблонизируемые слоты задачи"""
+        return {
+            name: task_data[name]
+            for name in self.slot_fields
+            if _is_templatable(task_data.get(name))
+        }
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, f"{fingerprint}.json")
+
+    def is_valid(self, result: Any) -> bool:
+        """План сохраняется только из успешного результата со всеми обязательными ключами"""
+        return (
+            isinstance(result, dict)
+            and result.get("success") is True
+            and all(key in result for key in self.required_keys)
+        )
+
+    def _get_sync(self, fingerprint: str, slots: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        path = self._path(fingerprint)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                plan = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return _from_template(plan, {_SLOT_MARKER % name: value for name, value in slots.items()})
+
+    def _put_sync(self, fingerprint: str, plan: Dict[str, Any], slots: Dict[str, str]) -> bool:
+        template = _to_template(plan, slots)
+        # Значение слота осталось вне ключей слотов: план привязан к этой задаче
+        for name, value in slots.items():
+            if _contains_value(template, value):
+                logger.debug("⏭️ План не кэшируется: значение слота %s встречается вне ключа %s", name, name)
+                return False
+        data = json_dumps(template)
+        # Атомарная запись: читатели видят либо старый, либо новый файл целиком
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(fingerprint))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._enforce_size_limit()
+        return True
+
+    def _enforce_size_limit(self) -> None:
+        """Удаление самых старых планов сверх max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    async def get(self, template_id: str, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """План для задачи с подставленными слотами или None"""
+        fingerprint = self.fingerprint(template_id, task_data)
+        plan = await asyncio.to_thread(self._get_sync, fingerprint, self._slots(task_data))
+        if plan is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            logger.debug("💾 Plan cache hit: %s (%s)", template_id, fingerprint[:12])
+        return plan
+
+    async def put(self, template_id: str, task_data: Dict[str, Any], plan: Dict[str, Any]) -> bool:
+        """
+        Сохранение плана (если результат проходит проверку is_valid и не содержит
+        значений слотов вне ключей слотов)
+        """
+        if not self.is_valid(plan):
+            return False
+        fingerprint = self.fingerprint(template_id, task_data)
+        try:
+            return await asyncio.to_thread(self._put_sync, fingerprint, plan, self._slots(task_data))
+        except OSError as e:
+            logger.warning("⚠️ Не удалось сохранить план %s: %s", template_id, e)
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Статистика попаданий"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "cache_dir": self.cache_dir
+        }
@@ -0,0 +1,35 @@
+"""
+Общие утилиты AI SEO Architects
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+
+    def json_dumps(obj: Any, sort_keys: bool = False) -> str:
+        """
+        Компактный JSON (orjson, если установлен, иначе stdlib json)
+
+        Args:
+            obj: Сериализуемый объект
+            sort_keys: Сортировать ключи (детерминированный вывод для ключей кэша)
+        """
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, default=str, option=option).decode("utf-8")
+
+except ImportError:
+    def json_dumps(obj: Any, sort_keys: bool = False) -> str:
+        """
+        Компактный JSON (orjson, если установлен, иначе stdlib json)
+
+        Args:
+            obj: Сериализуемый объект
+            sort_keys: Сортировать ключи (детерминированный вывод для ключей кэша)
+        """
+        # Те же разделители и UTF-8 без экранирования, что у orjson
+        return json.dumps(obj, ensure_ascii=False, default=str, separators=(",", ":"), sort_keys=sort_keys)
+
+
+__all__ = ["json_dumps"]
@@ -76,14 +76,21 @@ class ChromaVectorStore:
             print(f"❌ Ошибка добавления документов в ChromaDB: {e}")
             return False
     
-    def similarity_search(self, query: str, k: int = 3) -> List[Document]:
-        """Поиск похожих документов в ChromaDB"""
+    def similarity_search(self, query: str, k: int = 3,
+                          query_embedding: Optional[List[float]] = None) -> List[Document]:
+        """Поиск похожих документов в ChromaDB (по готовому эмбеддингу, если передан)"""
         try:
             # Выполняем поиск в ChromaDB
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=min(k, self.collection.count())
-            )
+            if query_embedding is not None:
+                results = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=min(k, self.collection.count())
+                )
+            else:
+                results = self.collection.query(
+                    query_texts=[query],
+                    n_results=min(k, self.collection.count())
+                )
             
             # Преобразуем результаты в Document объекты
             documents = []
@@ -211,7 +218,20 @@ class ChromaKnowledgeManager:
             print(f"⚠️ Знания для агента {agent_name} не найдены в {knowledge_path}")
             return None
     
-    def search_knowledge(self, agent_name: str, query: str, k: int = None) -> List[Document]:
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Эмбеддинги для пачки запросов одним вызовом API
+        
+        Args:
+            texts: Поисковые запросы
+            
+        Returns:
+            List[List[float]]: Эмбеддинги в порядке texts
+        """
+        return self.embeddings.embed_documents(texts)
+    
+    def search_knowledge(self, agent_name: str, query: str, k: int = None,
+                         query_embedding: Optional[List[float]] = None) -> List[Document]:
         """
         Поиск релевантных знаний для агента через ChromaDB
         
@@ -219,6 +239,7 @@ class ChromaKnowledgeManager:
             agent_name: Имя агента
             query: Поисковый запрос
             k: Количество результатов (по умолчанию из конфигурации)
+            query_embedding: Готовый эмбеддинг запроса (см. embed_queries)
             
         Returns:
             List[Document]: Список релевантных документов
@@ -230,13 +251,16 @@ class ChromaKnowledgeManager:
         k = k or config.RAG_TOP_K
         
         try:
-            results = self.vector_stores[agent_name].similarity_search(query, k=k)
+            results = self.vector_stores[agent_name].similarity_search(
+                query, k=k, query_embedding=query_embedding
+            )
             return results
         except Exception as e:
             print(f"⚠️ Ошибка поиска знаний для {agent_name}: {e}")
             return []
     
-    def get_knowledge_context(self, agent_name: str, query: str, k: int = None) -> str:
+    def get_knowledge_context(self, agent_name: str, query: str, k: int = None,
+                              query_embedding: Optional[List[float]] = None) -> str:
         """
         Получает контекст знаний в виде строки для использования в промпте
         
@@ -244,11 +268,12 @@ class ChromaKnowledgeManager:
             agent_name: Имя агента
             query: Поисковый запрос
             k: Количество результатов
+            query_embedding: Готовый эмбеддинг запроса (см. embed_queries)
             
         Returns:
             str: Форматированный контекст знаний
         """
-        relevant_docs = self.search_knowledge(agent_name, query, k)
+        relevant_docs = self.search_knowledge(agent_name, query, k, query_embedding=query_embedding)
         
         if not relevant_docs:
             return ""
@@ -5,6 +5,7 @@
 """
 
 import asyncio
+import sys
 import time
 import json
 from datetime import datetime
@@ -31,8 +32,7 @@ class QuickSystemTester:
         
     def log(self, message: str, level: str = "INFO"):
         """Логирование с timestamp"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] {level}: {message}")
+        sys.stdout.write(f"[{time.strftime('%H:%M:%S')}] {level}: {message}\n")
     
     async def run_all_tests(self) -> Dict[str, Any]:
         """Запуск всех тестов системы"""
@@ -378,5 +378,7 @@ async def main():
         return 1
 
 if __name__ == "__main__":
+    from config.env import install_event_loop_policy
+    install_event_loop_policy()
     exit_code = asyncio.run(main())
     exit(exit_code)
\ No newline at end of file
@@ -8,10 +8,11 @@ import uvicorn
 import sys
 import os
 from pathlib import Path
-from dotenv import load_dotenv
+from config.env import bootstrap_env
 
-# Загружаем переменные окружения из .env файла
-load_dotenv()
+# Загружаем переменные окружения из .env файла до запуска воркеров,
+# которые унаследуют уже заполненное окружение
+bootstrap_env()
 
 # Добавляем корневую директорию в PATH
 project_root = Path(__file__).parent
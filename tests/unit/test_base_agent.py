@@ -0,0 +1,179 @@
+"""
+Юнит-тесты базового агента (core/base_agent.py)
+"""
+
+import asyncio
+from contextlib import aclosing
+from types import SimpleNamespace
+
+import pytest
+
+import core.base_agent as base_agent
+from core.base_agent import BaseAgent, _get_openai_client, close_openai_clients
+
+
+class EchoAgent(BaseAgent):
+    async def process_task(self, task_data):
+        return {"success": True, "task": task_data}
+
+
+def _agent(**kwargs):
+    return EchoAgent("echo_agent", "Echo Agent", "operational", rag_enabled=False, **kwargs)
+
+
+@pytest.mark.parametrize("user_prompt, task_data, searched", [
+    # Служебные команды пропускаются независимо от данных задачи
+    ("ping", {"domain": "example.com", "depth": "full"}, False),
+    ("  Status ", {}, False),
+    # Порог длины считается по запросу целиком: короткий промпт с данными задачи ищет
+    ("Аудит", {"domain": "example.com"}, True),
+    ("Аудит", {}, False),
+    ("Аудит", {"a": 1}, False),
+    # Пустые данные задачи не отменяют поиск для развернутого промпта
+    ("Проанализируй техническое SEO сайта", {}, True),
+])
+def test_rag_skip(user_prompt, task_data, searched):
+    agent = _agent()
+    agent.rag_enabled = True
+    queries = []
+
+    async def get_knowledge_context(query, k=3):
+        queries.append(query)
+        return "контекст"
+
+    agent.get_knowledge_context = get_knowledge_context
+    _, knowledge_context = asyncio.run(agent._build_llm_messages(user_prompt, task_data))
+
+    assert bool(queries) is searched
+    assert knowledge_context == ("контекст" if searched else "")
+    assert agent.metrics.rag_skipped_count == (0 if searched else 1)
+    assert agent.metrics.to_dict()["rag_skipped_count"] == agent.metrics.rag_skipped_count
+
+
+class FlakyAgent(BaseAgent):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = 0
+
+    async def process_task(self, task_data):
+        self.calls += 1
+        raise ValueError("boom")
+
+
+def test_retry_policy_follows_retry_config(caplog):
+    agent = FlakyAgent("flaky_agent", "Flaky Agent", "operational", rag_enabled=False,
+                       retry_attempts=1, retry_delay=0.0)
+
+    result = asyncio.run(agent.process_task_with_retry({"task_id": "t1"}))
+    assert result["success"] is False
+    assert agent.calls == 1
+
+    # Изменение политики после создания агента применяется к следующей задаче
+    agent.retry_config["max_attempts"] = 3
+    with caplog.at_level("WARNING"):
+        asyncio.run(agent.process_task_with_retry({"task_id": "t2"}))
+    assert agent.calls == 4
+    assert "Error in process_task (attempt 1)" in caplog.text
+
+
+def test_execute_with_metrics_records_through_agent_metrics():
+    agent = _agent()
+
+    async def ok():
+        return {"success": True}
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    asyncio.run(agent._execute_with_metrics(ok))
+    error = asyncio.run(agent._execute_with_metrics(fail))
+
+    metrics = agent.metrics.to_dict()
+    assert (agent.metrics.tasks_processed, agent.metrics.tasks_successful, agent.metrics.tasks_failed) == (2, 1, 1)
+    assert agent.metrics.success_rate == 0.5
+    assert error["success"] is False
+    # Время ошибки и last_activity берутся из одного чтения часов
+    assert error["timestamp"] == metrics["last_activity"]
+
+
+def test_openai_client_is_per_loop_and_closed_on_shutdown():
+    async def use_and_close():
+        client = _get_openai_client("sk-test")
+        assert _get_openai_client("sk-test") is client
+        await close_openai_clients()
+        return client
+
+    first = asyncio.run(use_and_close())
+    second = asyncio.run(use_and_close())
+
+    assert first is not second
+    assert first.is_closed() and second.is_closed()
+
+
+class _FakeStream:
+    """Поток chat completions: фрагменты content, затем (опционально) ошибка"""
+
+    def __init__(self, parts, error=None):
+        self.parts = parts
+        self.error = error
+        self.closed = False
+
+    def __aiter__(self):
+        return self._chunks()
+
+    async def _chunks(self):
+        for part in self.parts:
+            delta = SimpleNamespace(content=part)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+        if self.error is not None:
+            raise self.error
+
+    async def close(self):
+        self.closed = True
+
+
+def _streaming_agent(stream):
+    agent = _agent()
+
+    async def create(**kwargs):
+        return stream
+
+    agent.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return agent
+
+
+def test_stream_closed_early_releases_gate(monkeypatch):
+    # Один слот: занятый слот виден как locked()
+    monkeypatch.setattr(base_agent, "_OPENAI_INFLIGHT", 1)
+    stream = _FakeStream(["a", "b", "c"])
+    agent = _streaming_agent(stream)
+
+    async def scenario():
+        async with aclosing(agent.process_with_llm_stream("Сформируй план контента", {})) as chunks:
+            async for delta in chunks:
+                break
+        return delta, BaseAgent._openai_gate().locked(), BaseAgent._OPENAI_IN_FLIGHT
+
+    first, gate_locked, in_flight = asyncio.run(scenario())
+
+    assert first == "a"
+    assert stream.closed is True
+    assert gate_locked is False
+    assert in_flight == 0
+
+
+def test_stream_error_yields_structured_failure():
+    agent = _streaming_agent(_FakeStream(["a"], error=RuntimeError("connection reset")))
+
+    async def scenario():
+        async with aclosing(agent.process_with_llm_stream("Сформируй план контента", {})) as chunks:
+            return [item async for item in chunks]
+
+    items = asyncio.run(scenario())
+
+    assert items[0] == "a"
+    failure = items[-1]
+    assert failure["success"] is False
+    assert failure["agent"] == "echo_agent"
+    assert failure["error"] == "connection reset"
+    assert "fallback_result" in failure
@@ -0,0 +1,111 @@
+"""
+Юнит-тесты кэша ответов LLM (core/llm_cache.py)
+"""
+
+import asyncio
+
+from core.llm_cache import InMemoryLRUBackend, LLMCache
+
+MESSAGES = [
+    {"role": "system", "content": "Ты SEO аналитик"},
+    {"role": "user", "content": "Проанализируй example.com"}
+]
+RESPONSE = {"success": True, "content": "ok", "usage": {"total_tokens": 42}}
+
+
+def test_nondeterministic_request_has_no_key():
+    cache = LLMCache()
+
+    assert cache.cache_key("gpt-4o-mini", MESSAGES, 0.7) is None
+    assert cache.cache_key("gpt-4o-mini", MESSAGES, 0) is not None
+
+
+def test_key_depends_on_model_messages_and_stream():
+    cache = LLMCache()
+    key = cache.cache_key("gpt-4o-mini", MESSAGES, 0)
+
+    assert key.startswith(LLMCache.KEY_PREFIX)
+    assert key == cache.cache_key("gpt-4o-mini", [dict(m) for m in MESSAGES], 0.0)
+    assert key != cache.cache_key("gpt-4o", MESSAGES, 0)
+    assert key != cache.cache_key("gpt-4o-mini", MESSAGES[:1], 0)
+    # Потоковый и обычный ответы не разделяют запись
+    assert key != cache.cache_key("gpt-4o-mini", MESSAGES, 0, stream=True)
+
+
+def test_get_set_and_stats():
+    cache = LLMCache()
+    key = cache.cache_key("gpt-4o-mini", MESSAGES, 0)
+
+    async def scenario():
+        miss = await cache.get(key)
+        await cache.set(key, RESPONSE)
+        hit = await cache.get(key)
+        # Без ключа кэш не используется и статистика не меняется
+        await cache.set(None, RESPONSE)
+        none = await cache.get(None)
+        return miss, hit, none
+
+    miss, hit, none = asyncio.run(scenario())
+
+    assert miss is None
+    assert hit == RESPONSE
+    assert none is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+    assert stats["backend"] == "InMemoryLRUBackend"
+
+
+def test_backend_evicts_least_recently_used():
+    backend = InMemoryLRUBackend(max_entries=2)
+
+    async def scenario():
+        await backend.set("a", 1)
+        await backend.set("b", 2)
+        await backend.get("a")
+        await backend.set("c", 3)
+        return [await backend.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [1, None, 3]
+    assert len(backend) == 2
+
+
+def test_backend_drops_expired_entries():
+    backend = InMemoryLRUBackend()
+
+    async def scenario():
+        await backend.set("stale", 1, ttl=0)
+        await backend.set("fresh", 2, ttl=60)
+        return await backend.get("stale"), await backend.get("fresh")
+
+    assert asyncio.run(scenario()) == (None, 2)
+    assert len(backend) == 1
+
+
+def test_cached_response_is_isolated_from_callers():
+    cache = LLMCache()
+    key = cache.cache_key("gpt-4o-mini", MESSAGES, 0)
+    response = {"success": True, "content": "ok", "usage": {"total_tokens": 42}}
+
+    async def scenario():
+        await cache.set(key, response)
+        # Изменение сохраненного и полученного ответа не меняет запись в кэше
+        response["usage"]["total_tokens"] = 0
+        first = await cache.get(key)
+        first["content"] = "changed"
+        first["usage"]["total_tokens"] = 1
+        return await cache.get(key)
+
+    assert asyncio.run(scenario()) == RESPONSE
+
+
+def test_default_ttl_applies_when_not_overridden():
+    backend = InMemoryLRUBackend()
+    cache = LLMCache(backend=backend, ttl=0)
+    key = cache.cache_key("gpt-4o-mini", MESSAGES, 0)
+
+    async def scenario():
+        await cache.set(key, RESPONSE)
+        return await cache.get(key)
+
+    # ttl=0 из конструктора: запись сразу просрочена
+    assert asyncio.run(scenario()) is None
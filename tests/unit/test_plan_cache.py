@@ -0,0 +1,86 @@
+"""
+Юнит-тесты кэша планов (core/plan_cache.py)
+"""
+
+import asyncio
+
+from core.plan_cache import PlanCache
+
+
+def _put_then_get(cache, template_id, stored_task, plan, new_task):
+    async def scenario():
+        stored = await cache.put(template_id, stored_task, plan)
+        return stored, await cache.get(template_id, new_task)
+    return asyncio.run(scenario())
+
+
+def test_slot_value_substituted_only_under_slot_key(tmp_path):
+    cache = PlanCache(cache_dir=str(tmp_path))
+    plan = {
+        "success": True,
+        "domain": "example.com",
+        "summary": "Score 91/100, 12 issues in 2021",
+        "pages": [{"domain": "example.com", "issues": 12}]
+    }
+
+    stored, result = _put_then_get(
+        cache, "audit",
+        {"domain": "example.com", "depth": "full"}, plan,
+        {"domain": "other-site.ru", "depth": "full"}
+    )
+
+    assert stored is True
+    assert result["domain"] == "other-site.ru"
+    assert result["pages"][0]["domain"] == "other-site.ru"
+    # Текст и числа плана не затрагиваются подстановкой
+    assert result["summary"] == "Score 91/100, 12 issues in 2021"
+    assert result["pages"][0]["issues"] == 12
+
+
+def test_numeric_slot_is_part_of_fingerprint(tmp_path):
+    cache = PlanCache(cache_dir=str(tmp_path))
+    plan = {"success": True, "client": 1, "summary": "Score 91/100, 12 issues in 2021"}
+
+    stored, result = _put_then_get(
+        cache, "report",
+        {"client_id": 1, "period": "q1"}, plan,
+        {"client_id": 7, "period": "q1"}
+    )
+
+    assert stored is True
+    # План клиента 1 не отдается клиенту 7
+    assert result is None
+
+
+def test_short_slot_value_is_not_templated(tmp_path):
+    cache = PlanCache(cache_dir=str(tmp_path))
+
+    assert cache.fingerprint("audit", {"domain": "a.b"}) != cache.fingerprint("audit", {"domain": "c.d"})
+    assert cache.fingerprint("audit", {"domain": "site-a.com"}) == cache.fingerprint("audit", {"domain": "site-b.com"})
+
+
+def test_plan_with_slot_value_outside_slot_key_is_not_stored(tmp_path):
+    cache = PlanCache(cache_dir=str(tmp_path))
+    plan = {"success": True, "domain": "example.com", "summary": "Аудит example.com завершен"}
+
+    stored, result = _put_then_get(
+        cache, "audit",
+        {"domain": "example.com"}, plan,
+        {"domain": "other-site.ru"}
+    )
+
+    assert stored is False
+    assert result is None
+
+
+def test_unsuccessful_result_is_not_stored(tmp_path):
+    cache = PlanCache(cache_dir=str(tmp_path))
+
+    stored, result = _put_then_get(
+        cache, "audit",
+        {"domain": "example.com"}, {"success": False, "error": "timeout"},
+        {"domain": "example.com"}
+    )
+
+    assert stored is False
+    assert result is None
@@ -0,0 +1,79 @@
+"""
+Юнит-тесты retry декоратора (core/base_agent.with_retry)
+"""
+
+import asyncio
+
+import pytest
+
+import core.base_agent as base_agent
+from core.base_agent import with_retry
+
+
+class _Recorder(list):
+    """Паузы retry; jitter_ranges - аргументы random.uniform"""
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Паузы вместо реального asyncio.sleep; множитель jitter фиксирован на верхней границе"""
+    recorded = _Recorder()
+    recorded.jitter_ranges = []
+
+    async def fake_sleep(seconds):
+        recorded.append(seconds)
+
+    def fake_uniform(low, high):
+        recorded.jitter_ranges.append((low, high))
+        return high
+
+    monkeypatch.setattr(base_agent.asyncio, "sleep", fake_sleep)
+    monkeypatch.setattr(base_agent.random, "uniform", fake_uniform)
+    return recorded
+
+
+def _failing(calls):
+    async def operation():
+        calls.append(1)
+        raise ValueError("boom")
+    return operation
+
+
+def test_delays_grow_with_backoff_and_are_clamped(sleeps):
+    calls = []
+    operation = with_retry(max_attempts=5, delay=1.0, backoff=2.0, timeout=1000, max_delay=3.0)(_failing(calls))
+
+    with pytest.raises(ValueError):
+        asyncio.run(operation())
+
+    assert len(calls) == 5
+    # 1, 2, min(4, 3), 3 с jitter x1.5; после последней попытки паузы нет
+    assert sleeps == [1.5, 3.0, 4.5, 4.5]
+    assert set(sleeps.jitter_ranges) == {(0.5, 1.5)}
+
+
+def test_gives_up_when_delay_exceeds_deadline(sleeps):
+    calls = []
+    operation = with_retry(max_attempts=5, delay=10.0, timeout=5.0)(_failing(calls))
+
+    with pytest.raises(ValueError):
+        asyncio.run(operation())
+
+    # Пауза 15 с не укладывается в timeout 5 с: без ожидания и без новых попыток
+    assert len(calls) == 1
+    assert sleeps == []
+
+
+def test_returns_result_after_retry(sleeps):
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ValueError("boom")
+        return "ok"
+
+    operation = with_retry(max_attempts=3, delay=0.5, timeout=1000)(flaky)
+
+    assert asyncio.run(operation()) == "ok"
+    assert sleeps == [0.75]